@@ -1,4 +1,4 @@
-
+from unittest import skipIf
 import mock
 from django.contrib.auth.models import AnonymousUser
 from ginger.forms import GingerForm
@@ -310,5 +310,274 @@ class TestGingerForm(test.SimpleTestCase):
         self.assertIn('age',form.errors)
 
 
+class TestActionForm(test.SimpleTestCase):
+
+    def test_run(self):
+        from ginger.forms.forms import ActionForm
+
+        class GreetForm(ActionForm):
+            name = forms.CharField()
+
+            def execute(self, data, greeting):
+                return "%s %s" % (greeting, data['name'])
+
+        form = GreetForm(data={'name': 'Zail'}, greeting="Hello")
+        self.assertEqual(form.context, {'greeting': "Hello"})
+        self.assertEqual(form.run(), (True, "Hello Zail"))
+        self.assertFalse(GreetForm(data={}, greeting="Hello").run()[0])
+
+
 class TestSearchForm(test.TestCase):
     pass
+
+
+class TestJSONBackends(test.SimpleTestCase):
+
+    def payload(self):
+        import decimal
+        import uuid
+        from django.contrib.auth.models import Permission
+
+        class Point(object):
+            def to_json(self):
+                return [1, 2]
+
+        return {
+            'amount': decimal.Decimal("1.50"),
+            'when': datetime(2020, 1, 2, 3, 4, 5, 678901),
+            'day': date(2020, 1, 2),
+            'id': uuid.UUID(int=7),
+            'point': Point(),
+            'dummy': DummyClass(),
+            'page': Paginator(list(range(30)), per_page=10).page(2),
+            'none': Permission.objects.none(),
+            1: 'one'
+        }
+
+    def encode(self, backend):
+        with override_settings(GINGER_JSON_BACKEND=backend):
+            return serializer.encode(self.payload(), serializers={DummyClass: lambda o: o.name})
+
+    def test_same_output(self):
+        expected = json.loads(self.encode("json"))
+        self.assertEqual(expected['amount'], '1.50')
+        self.assertEqual(expected['when'], '2020-01-02T03:04:05.678')
+        for backend in ("auto", "orjson"):
+            if backend == "orjson" and serializer.orjson is None:
+                continue
+            self.assertEqual(json.loads(self.encode(backend)), expected)
+
+    def test_fallback(self):
+        big = 2 ** 70
+        with override_settings(GINGER_JSON_BACKEND="auto"):
+            self.assertEqual(json.loads(serializer.encode({'big': big})), {'big': big})
+            self.assertEqual(serializer.encode([1], indent=2), '[\n  1\n]')
+            self.assertRaises(TypeError, serializer.encode, object())
+        with override_settings(GINGER_JSON_BACKEND="yaml"):
+            self.assertRaises(ValueError, serializer.encode, [])
+
+    def test_default_backend(self):
+        self.assertIs(type(serializer.get_backend()), serializer.JSONBackend)
+
+    @skipIf(serializer.orjson is None, "orjson is not installed")
+    def test_serializer_errors(self):
+        calls = []
+
+        class Broken(object):
+            def to_json(self):
+                calls.append(self)
+                raise TypeError("broken")
+        with override_settings(GINGER_JSON_BACKEND="orjson"):
+            self.assertRaises(TypeError, serializer.encode, [Broken()])
+        self.assertEqual(len(calls), 1)
+
+
+class TestStreamingJSON(test.TestCase):
+
+    def test_iter_encode(self):
+        from django.contrib.auth.models import Permission
+        queryset = Permission.objects.values("pk", "codename").order_by("pk")
+        payload = {'data': queryset, 'page': {'size': 2}, 'rest': iter([1, 2]), 3: None}
+        chunks = list(serializer.iter_encode(payload, chunk_size=4, buffer_size=100))
+        self.assertGreater(len(chunks), 1)
+        result = json.loads("".join(chunks))
+        self.assertEqual(result['data'], list(queryset))
+        self.assertEqual(result['rest'], [1, 2])
+        self.assertEqual(result['3'], None)
+        self.assertEqual(json.loads("".join(serializer.iter_encode({'data': iter([])}))), {'data': []})
+
+    def test_view(self):
+        from django.contrib.auth.models import Permission
+        from ginger.paginator import GingerPaginator
+        queryset = Permission.objects.values_list("codename", flat=True).order_by("pk")
+        view = type("anything", (views.GingerJSONView,), {
+            'stream_collections': True,
+            'get': lambda self: GingerPaginator(queryset, per_page=5).page(2)
+        }).as_view()
+        request = test.RequestFactory().get("/")
+        request.user = AnonymousUser()
+        response = view(request)
+        self.assertTrue(response.streaming)
+        result = json.loads(b"".join(response.streaming_content).decode("utf-8"))
+        self.assertEqual(result['data'], list(queryset[5:10]))
+        self.assertEqual(result['page']['index'], 2)
+
+
+class ContentTypeSerializer(serializer.Serializer):
+    app_label = serializer.Field()
+    model = serializer.Field()
+
+
+class PermissionSerializer(serializer.Serializer):
+    codename = serializer.Field()
+    app = serializer.Field(attr="content_type__app_label")
+    content_type = serializer.Nested(ContentTypeSerializer)
+
+
+class GroupSerializer(serializer.Serializer):
+    name = serializer.Field()
+    permissions = serializer.Nested(PermissionSerializer, many=True)
+
+
+class AttnameSerializer(serializer.Serializer):
+    codename = serializer.Field()
+    content_type_id = serializer.Field()
+
+
+class NaturalKeySerializer(serializer.Serializer):
+    codename = serializer.Field()
+    kind = serializer.Nested(ContentTypeSerializer, attr="kind")
+
+
+class TestSerializerClasses(test.TestCase):
+
+    def expected(self, permission):
+        content_type = {'app_label': permission.content_type.app_label, 'model': permission.content_type.model}
+        return {'codename': permission.codename, 'app': content_type['app_label'], 'content_type': content_type}
+
+    def test_values_plan(self):
+        from django.contrib.auth.models import Permission
+        fields, build, _, prefetch = PermissionSerializer.get_queryset_plan(Permission)
+        self.assertEqual(fields, ["codename", "content_type__app_label", "content_type__pk",
+                                  "content_type__app_label", "content_type__model"])
+        queryset = Permission.objects.order_by("pk")
+        expected = [self.expected(p) for p in queryset]
+        with self.assertNumQueries(1):
+            self.assertEqual(PermissionSerializer.serialize(queryset), expected)
+        self.assertEqual(PermissionSerializer.serialize(list(queryset)), expected)
+        self.assertEqual(PermissionSerializer(queryset[0]).to_json(), expected[0])
+
+    def test_attname(self):
+        from django.contrib.auth.models import Permission
+        fields, build, select_related, _ = AttnameSerializer.get_queryset_plan(Permission)
+        self.assertEqual((fields, select_related), (["codename", "content_type_id"], []))
+        queryset = Permission.objects.order_by("pk")
+        expected = [{'codename': p.codename, 'content_type_id': p.content_type_id} for p in queryset]
+        with self.assertNumQueries(1):
+            self.assertEqual(AttnameSerializer.serialize(queryset), expected)
+
+    def test_nested_attribute(self):
+        from django.contrib.auth.models import Permission
+        natural_key = type("NaturalKeySerializer", (serializer.Serializer,), {
+            'key': serializer.Nested(ContentTypeSerializer, attr="natural_key")
+        })
+        self.assertEqual(natural_key.get_queryset_plan(Permission), (None, None, [], []))
+        self.assertEqual(NaturalKeySerializer.get_queryset_plan(Permission), (None, None, [], []))
+        try:
+            Permission.kind = property(lambda self: self.content_type)
+            queryset = Permission.objects.order_by("pk")
+            expected = [{'codename': p.codename, 'kind': self.expected(p)['content_type']} for p in queryset]
+            self.assertEqual(NaturalKeySerializer.serialize(queryset), expected)
+        finally:
+            del Permission.kind
+
+    def test_nested_many(self):
+        from django.contrib.auth.models import Group, Permission
+        group = Group.objects.create(name="staff")
+        group.permissions.set(Permission.objects.order_by("pk")[:3])
+        self.assertIsNone(GroupSerializer.get_queryset_plan(Group)[0])
+        with self.assertNumQueries(3):
+            result = json.loads(serializer.encode({'groups': Group.objects.all()},
+                                                  serializers={Group: GroupSerializer}))
+        self.assertEqual(result['groups'][0]['name'], "staff")
+        self.assertEqual(len(result['groups'][0]['permissions']), 3)
+        streamed = json.loads("".join(serializer.iter_encode(Group.objects.all(),
+                                                             serializers={Group: GroupSerializer})))
+        self.assertEqual(streamed, result['groups'])
+
+
+class TestStreamingRequests(test.SimpleTestCase):
+
+    def post(self, content, content_type="application/json", **attrs):
+        received = []
+
+        def post(self, items):
+            received.extend(items)
+            return {'count': len(received)}
+        attrs.setdefault('post', post)
+        attrs.setdefault('stream_argument', 'items')
+        view = type("anything", (views.GingerJSONView,), attrs).as_view()
+        request = test.RequestFactory().post("/", data=content, content_type=content_type)
+        request.user = AnonymousUser()
+        response = view(request)
+        return response, json.loads(response.content.decode("utf-8")), received
+
+    def test_array(self):
+        items = [{'value': '*' * 1024, 'index': i} for i in range(100)]
+        response, payload, received = self.post(json.dumps(items))
+        self.assertEqual(payload, {'count': 100})
+        self.assertEqual(received, items)
+
+    def test_ndjson(self):
+        content = "\n".join(json.dumps({'index': i}) for i in range(5)) + "\n\n"
+        response, payload, received = self.post(content, "application/x-ndjson")
+        self.assertEqual([item['index'] for item in received], list(range(5)))
+
+    def test_limits(self):
+        response, payload, _ = self.post(json.dumps(list(range(1000))), MAX_STREAM_SIZE=100)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(payload['type'], 'BadRequest')
+        response, payload, _ = self.post("[1, 2", MAX_STREAM_SIZE=100)
+        self.assertEqual(response.status_code, 400)
+        response, payload, _ = self.post(json.dumps({'value': '*' * 40000}), stream_argument=None,
+                                         MAX_CONTENT_SIZE=64 * 1024,
+                                         post=lambda self, value: {'size': len(value)})
+        self.assertEqual(payload, {'size': 40000})
+
+
+class TestBatchCalls(test.SimpleTestCase):
+
+    class BatchView(views.GingerJSONView):
+        batch_methods = ("add", "fail")
+
+        def add(self, a, b):
+            return {'sum': a + b}
+
+        def fail(self):
+            raise exceptions.NotFound
+
+        def secret(self):
+            return "secret"
+
+    def call(self, calls, **attrs):
+        view = type("BatchView", (self.BatchView,), attrs).as_view()
+        request = test.RequestFactory().post("/", data=json.dumps(calls), content_type="application/json")
+        request.user = AnonymousUser()
+        response = view(request)
+        return response, json.loads(response.content.decode("utf-8"))
+
+    def test_batch(self):
+        calls = [{'id': i, 'method': 'add', 'params': {'a': i, 'b': 1}} for i in range(3)]
+        calls += [{'id': 'x', 'method': 'fail'}, {'id': 'y', 'method': 'secret'}, {'method': 'add', 'params': [1]}]
+        for workers in (None, 4):
+            response, payload = self.call(calls, batch_workers=workers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(payload[:3], [{'id': i, 'status': 200, 'data': {'sum': i + 1}} for i in range(3)])
+            self.assertEqual([(r['id'], r['status']) for r in payload[3:]], [('x', 404), ('y', 405), (None, 400)])
+            self.assertEqual(payload[3]['error']['type'], 'NotFound')
+
+    def test_limits(self):
+        response, payload = self.call([{'method': 'fail'}] * 3, MAX_BATCH_SIZE=2)
+        self.assertEqual(response.status_code, 400)
+        response, payload = self.call([{'method': 'fail'}], batch_methods=None)
+        self.assertEqual(response.status_code, 405)
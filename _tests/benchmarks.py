@@ -0,0 +1,243 @@
+"""
+Micro-benchmarks comparing optimized code paths against the ones they replaced.
+
+Usage: python -m _tests.benchmarks [name ...]
+"""
+from __future__ import print_function
+
+import sys
+import timeit
+
+
+def setup_django():
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure(
+            INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth'],
+            DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        )
+    import django
+    django.setup()
+
+
+def report(name, **timings):
+    baseline = timings.pop("baseline")
+    print("%s: baseline %.4fs" % (name, baseline))
+    for key, value in sorted(timings.items()):
+        print("    %s %.4fs (%.1fx)" % (key, value, baseline / value if value else float("inf")))
+
+
+def bench_format_cell(rows=200, cols=30, repeat=5):
+    """
+    Rendering every cell of a rows x cols dataset with render_<name>/render_<kind> lookups
+    resolved per cell versus once per class
+    """
+    from django.utils import six
+    from ginger.dataset import Column, GingerDataSet
+
+    attrs = dict(("col%d" % i, Column(kind="int" if i % 3 else None)) for i in range(cols))
+    attrs["render_int"] = lambda self, value, index, row: "%d" % value
+    attrs["render_col1"] = lambda self, value, index, row: "#%d" % value
+    dataset_class = type("BenchmarkDataSet", (GingerDataSet,), attrs)
+    dataset = dataset_class([[i * j for j in range(cols)] for i in range(rows)])
+
+    def legacy_format_cell(value, index, row):
+        column = dataset.columns[index]
+        for suffix in (column.name, column.kind):
+            func = getattr(dataset, "render_%s" % suffix, None)
+            if func:
+                return func(value, index, row)
+        return six.text_type(value) if value is not None else ""
+
+    def render(format_cell):
+        def run():
+            for row in dataset:
+                data = row.data
+                for i in range(cols):
+                    format_cell(data[i], i, row)
+        return run
+
+    report("format_cell %dx%d" % (rows, cols),
+           baseline=min(timeit.repeat(render(legacy_format_cell), number=1, repeat=repeat)),
+           cached=min(timeit.repeat(render(dataset._format_cell), number=1, repeat=repeat)))
+
+
+def bench_json_encode(rows=2000, repeat=5):
+    """
+    Encoding a list of dicts with dates and decimals through each available json backend
+    """
+    import datetime
+    import decimal
+    from django.test.utils import override_settings
+    from ginger import serializer
+
+    payload = [{"id": i, "name": "item %d" % i, "price": decimal.Decimal("%d.25" % i),
+                "created": datetime.datetime(2020, 1, 1, 12, i % 60), "tags": ["a", "b"]}
+               for i in range(rows)]
+
+    def run(backend):
+        def encode():
+            with override_settings(GINGER_JSON_BACKEND=backend):
+                serializer.encode(payload)
+        return min(timeit.repeat(encode, number=1, repeat=repeat))
+
+    timings = {}
+    if serializer.orjson is not None:
+        timings["orjson"] = run("orjson")
+    if serializer.ujson is not None:
+        timings["ujson"] = run("ujson")
+    report("json_encode %d rows" % rows, baseline=run("json"), **timings)
+
+
+def bench_page_context(requests=2000, repeat=5):
+    """
+    Requests to a GingerTemplateView whose render_to_response inspects the signature of every
+    get_page_* method per request versus once per class
+    """
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from ginger import utils
+    from ginger.views import GingerTemplateView, generic
+
+    class PageView(GingerTemplateView):
+        template_name = "page.html"
+        page_title = "Title"
+
+        def get_page_heading(self):
+            return "Heading"
+
+    view = PageView.as_view()
+    request = RequestFactory().get("/")
+    request.user = AnonymousUser()
+
+    def legacy_get_argspec(func):
+        spec = __import__("inspect").getfullargspec(getattr(func, "__func__", func))
+        return utils.ArgSpec(tuple(spec.args), spec.varargs, spec.varkw)
+
+    def run(get_argspec, clear):
+        def dispatch():
+            for i in range(requests):
+                if clear:
+                    generic._page_context_adapters.clear()
+                view(request)
+        original = utils.get_argspec
+        utils.get_argspec = get_argspec
+        try:
+            return min(timeit.repeat(dispatch, number=1, repeat=repeat))
+        finally:
+            utils.get_argspec = original
+
+    response = view(request)
+    assert response.context_data["page_heading"] == "Heading", response.context_data
+    report("page_context %d requests" % requests,
+           baseline=run(legacy_get_argspec, True), cached=run(utils.get_argspec, False))
+
+
+def bench_form_init(forms=2000, repeat=5):
+    """
+    Constructing and validating a GingerForm with constructor and execute signatures inspected
+    per form versus once per class
+    """
+    from django import forms as django_forms
+    from ginger import utils
+    from ginger.forms import GingerForm, actions
+
+    class AgeForm(GingerForm):
+        age = django_forms.IntegerField()
+
+        def execute(self, data, owner=None):
+            return data
+
+    def legacy_get_argspec(func):
+        spec = __import__("inspect").getfullargspec(getattr(func, "__func__", func))
+        return utils.ArgSpec(tuple(spec.args), spec.varargs, spec.varkw)
+
+    def run(get_argspec, clear):
+        def construct():
+            for i in range(forms):
+                if clear:
+                    actions._constructor_keywords.clear()
+                AgeForm(data={"age": i}, owner="me").run()
+        original = utils.get_argspec
+        utils.get_argspec = get_argspec
+        try:
+            return min(timeit.repeat(construct, number=1, repeat=repeat))
+        finally:
+            utils.get_argspec = original
+
+    report("form_init %d forms" % forms,
+           baseline=run(legacy_get_argspec, True), cached=run(utils.get_argspec, False))
+
+
+def bench_resolve(views=300, repeat=5):
+    """
+    Resolving paths against the url patterns of many viewsets with Django's linear resolver versus
+    the trie resolver built by scan(compiled=True)
+    """
+    from django.conf.urls import url
+    from django.core.urlresolvers import RegexURLResolver
+    from ginger.conf.urls import TrieURLResolver
+    from ginger.pattern import Pattern
+
+    def endpoint(request, **kwargs):
+        pass
+
+    urls = []
+    for i in range(views):
+        for suffix in ("", "object_id:int/", "object_id:int/edit/", "new/"):
+            source = Pattern("section%d/%s" % (i, suffix))
+            pattern = url(source.create(), endpoint, name="view_%d_%d" % (i, len(urls)))
+            pattern.source_pattern = source
+            urls.append(pattern)
+    paths = ["/section%d/%d/edit/" % (i, i) for i in range(0, views, 7)]
+
+    def run(resolver):
+        resolver.resolve(paths[0])
+
+        def resolve():
+            for path in paths:
+                resolver.resolve(path)
+        return min(timeit.repeat(resolve, number=1, repeat=repeat))
+
+    report("resolve %d patterns" % len(urls),
+           baseline=run(RegexURLResolver(r"^/", urls)),
+           trie=run(RegexURLResolver(r"^/", [TrieURLResolver(urls)])))
+
+
+def bench_reverse(views=300, rows=100, repeat=5):
+    """
+    Reversing the detail url of every row of a table page with django's reverse versus the cached
+    formatters of ginger.urlcache
+    """
+    import types
+    from django.conf.urls import url
+    from django.core.urlresolvers import reverse
+    from ginger import urlcache
+
+    def endpoint(request, **kwargs):
+        pass
+
+    urlconf = types.ModuleType("benchmark_urls")
+    urlconf.urlpatterns = [url(r"^section%d/(?P<object_id>\d+)/$" % i, endpoint, name="detail_%d" % i)
+                           for i in range(views)]
+
+    def run(func):
+        def render():
+            for i in range(rows):
+                func("detail_%d" % (views - 1), urlconf=urlconf, kwargs={"object_id": i})
+        render()
+        return min(timeit.repeat(render, number=1, repeat=repeat))
+
+    report("reverse %d rows" % rows, baseline=run(reverse), cached=run(urlcache.reverse))
+
+
+def main(names=None):
+    setup_django()
+    module = sys.modules[__name__]
+    benchmarks = sorted(n[6:] for n in dir(module) if n.startswith("bench_"))
+    for name in names or benchmarks:
+        getattr(module, "bench_%s" % name)()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,244 @@
+from unittest import skipIf
+
+from django import test
+
+from ginger import stats
+from ginger.dataset import Column, GingerDataSet
+from ginger.datasets import columnar
+
+
+class Payment(object):
+
+    def __init__(self, name, amount):
+        self.name = name
+        self.amount = amount
+
+
+class PaymentDataSet(columnar.ColumnarDataSet):
+    name = Column()
+    amount = Column(kind="int")
+
+
+class TestColumnarDataSet(test.SimpleTestCase):
+
+    def setUp(self):
+        self.objects = [Payment("a", 3), Payment("b", None), Payment("c", 1)]
+        self.dataset = PaymentDataSet(self.objects)
+
+    def test_rows(self):
+        self.assertEqual(len(self.dataset), 3)
+        self.assertEqual([r.data for r in self.dataset], [("a", 3), ("b", None), ("c", 1)])
+        self.assertEqual(self.dataset[0].amount, 3)
+        self.assertIsNone(self.dataset[-2]["amount"])
+
+    def test_typed_storage(self):
+        data = self.dataset.columns["amount"].data
+        self.assertTrue(data.is_typed())
+        self.assertEqual(list(data), [3, None, 1])
+        self.assertFalse(self.dataset.columns["name"].data.is_typed())
+
+    def test_untyped_fallback(self):
+        self.dataset[0].amount = "many"
+        data = self.dataset.columns["amount"].data
+        self.assertFalse(data.is_typed())
+        self.assertEqual(list(data), ["many", None, 1])
+
+    def test_decimal_values(self):
+        from decimal import Decimal
+
+        class PriceDataSet(columnar.ColumnarDataSet):
+            name = Column()
+            amount = Column(kind="number")
+        dataset = PriceDataSet([Payment("a", 1.5), Payment("b", Decimal("0.10"))])
+        self.assertFalse(dataset.columns["amount"].data.is_typed())
+        self.assertEqual(list(dataset.columns["amount"]), [1.5, Decimal("0.10")])
+        dataset = PriceDataSet([Payment("a", 1.5)])
+        dataset[0].amount = Decimal("2.25")
+        self.assertIsInstance(dataset[0].amount, Decimal)
+
+    def test_sort(self):
+        self.dataset.columns["amount"].sort()
+        self.assertEqual(list(self.dataset.columns["name"]), ["b", "c", "a"])
+
+    def test_aggregates(self):
+        self.dataset.aggregates.append(["Total", 4])
+        self.assertEqual(list(self.dataset.aggregates[0].cells()), ["Total", "4"])
+
+    def test_same_output_as_row_dataset(self):
+        class RowDataSet(GingerDataSet):
+            name = Column()
+            amount = Column(kind="int")
+        rows = RowDataSet(self.objects)
+        self.assertEqual([list(r.cells()) for r in rows], [list(r.cells()) for r in self.dataset])
+
+    @skipIf(columnar.numpy is None, "numpy is not installed")
+    def test_to_array(self):
+        values = self.dataset.columns["amount"].to_array()
+        self.assertEqual(values.sum(), 4)
+        self.assertEqual(values.count(), 2)
+
+
+class TestColumnAggregates(test.SimpleTestCase):
+
+    def create(self, base):
+        return type("AggregateDataSet", (base,), {
+            "name": Column(),
+            "amount": Column(kind="int"),
+            "column_aggregates": {"amount": ["sum", "mean", "min", "max", "count"]}
+        })
+
+    def check(self, base):
+        dataset = self.create(base)([Payment("a", 3), Payment("b", None), Payment("c", 1)])
+        rows = [row.data for row in dataset.aggregates]
+        self.assertEqual([r[1] for r in rows], [2, 4, 2, 1, 3])
+        self.assertEqual([r[0] for r in rows], ["Count", "Total", "Average", "Minimum", "Maximum"])
+        dataset.append(Payment("d", 6))
+        dataset.update_aggregates()
+        self.assertEqual(len(dataset.aggregates), 5)
+        self.assertEqual(dataset.aggregates[1].amount, 10)
+
+    def test_rows(self):
+        self.check(GingerDataSet)
+
+    def test_columnar(self):
+        self.check(columnar.ColumnarDataSet)
+
+    def test_unknown_aggregate(self):
+        self.assertRaises(ValueError, stats.aggregate, [1, 2], ["median"])
+
+
+class PermissionDataSet(GingerDataSet):
+    name = Column()
+    app = Column(attr="content_type__app_label")
+
+
+class TestQuerySetPlan(test.SimpleTestCase):
+
+    def test_values_list(self):
+        from django.contrib.auth.models import Permission
+        fields, related = PermissionDataSet.get_queryset_plan(Permission)
+        self.assertEqual(fields, ["name", "content_type__app_label"])
+        queryset = PermissionDataSet().prepare_queryset(Permission.objects.all())
+        self.assertIsNone(queryset._fields)
+        self.assertEqual(queryset.query.select_related, {"content_type": {}})
+
+        class TupleDataSet(PermissionDataSet):
+            use_values_list = True
+
+        queryset = TupleDataSet().prepare_queryset(Permission.objects.all())
+        self.assertEqual(queryset._fields, ("name", "content_type__app_label"))
+
+    def test_select_related_fallback(self):
+        from django.contrib.auth.models import Permission
+
+        class ContentTypeDataSet(PermissionDataSet):
+            content_type = Column()
+
+        fields, related = ContentTypeDataSet.get_queryset_plan(Permission)
+        self.assertIsNone(fields)
+        self.assertEqual(related, ["content_type"])
+        queryset = ContentTypeDataSet().prepare_queryset(Permission.objects.all())
+        self.assertIsNone(queryset._fields)
+        self.assertEqual(queryset.query.select_related, {"content_type": {}})
+
+
+class TestQuerySetPlanAttname(test.SimpleTestCase):
+
+    def test_foreign_key_attname(self):
+        from django.contrib.auth.models import Permission
+
+        class ContentTypeIdDataSet(GingerDataSet):
+            name = Column()
+            content_type_id = Column()
+
+        fields, related = ContentTypeIdDataSet.get_queryset_plan(Permission)
+        self.assertEqual(fields, ["name", "content_type_id"])
+        self.assertEqual(related, [])
+        queryset = ContentTypeIdDataSet().prepare_queryset(Permission.objects.all())
+        self.assertEqual(queryset.query.select_related, False)
+        str(queryset.query)
+
+
+class TestStreamingExport(test.SimpleTestCase):
+
+    def test_csv_chunks(self):
+        class FormattedDataSet(PaymentDataSet):
+            def render_int(self, value, index, row):
+                return "%s.00" % value
+        dataset = FormattedDataSet()
+        objects = [Payment(str(i), i) for i in range(5)]
+        chunks = list(dataset.stream_csv(objects, header=True, chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        lines = "".join(chunks).splitlines()
+        self.assertEqual(lines[0], "Name,Amount")
+        self.assertEqual(lines[1:], ["%s,%s.00" % (i, i) for i in range(5)])
+        self.assertEqual(len(dataset), 0)
+
+    def test_response(self):
+        response = PaymentDataSet().export_response([Payment("a", 1)], "csv", filename="payments")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="payments.csv"')
+        self.assertEqual(b"".join(response.streaming_content), b"a,1\r\n")
+        self.assertRaises(ValueError, PaymentDataSet().export_response, [], "pdf")
+
+
+class TestCellFormatters(test.SimpleTestCase):
+
+    def test_dispatch(self):
+        class RenderDataSet(GingerDataSet):
+            name = Column(kind="text")
+            amount = Column(kind="int")
+            note = Column()
+
+            def render_text(self, value, index, row):
+                return "text"
+
+            def render_name(self, value, index, row):
+                return "name"
+
+            def render_int(self, value, index, row):
+                return "int"
+
+        dataset = RenderDataSet([["a", 1, None]])
+        self.assertEqual(RenderDataSet.get_renderer_names(), ("render_name", "render_int", None))
+        self.assertEqual(list(dataset[0].cells()), ["name", "int", ""])
+
+    def test_class_caches_are_weak(self):
+        import gc
+        import weakref
+        from django.contrib.auth.models import Permission
+        dataset_class = type("TemporaryDataSet", (PermissionDataSet,), {})
+        dataset_class.get_renderer_names()
+        dataset_class.get_queryset_plan(Permission)
+        ref = weakref.ref(dataset_class)
+        del dataset_class
+        gc.collect()
+        self.assertIsNone(ref())
+
+
+class TestColumnIndex(test.SimpleTestCase):
+
+    def setUp(self):
+        class RowDataSet(GingerDataSet):
+            name = Column()
+            amount = Column(kind="int")
+        self.dataset = RowDataSet([Payment("a", 3), Payment("b", None), Payment("c", 1)])
+
+    def test_name_lookup(self):
+        columns = self.dataset.columns
+        self.assertEqual(columns["amount"].position, 1)
+        self.assertRaises(KeyError, lambda: columns["missing"])
+
+    def test_visible_cache(self):
+        columns = self.dataset.columns
+        self.assertEqual(len(columns.visible()), 2)
+        columns["name"].hide()
+        self.assertEqual([c.name for c in columns.visible()], ["amount"])
+        self.assertEqual(list(self.dataset[0]), [3])
+        columns["name"].toggle()
+        self.assertEqual(len(self.dataset[0]), 2)
+
+    def test_random_access(self):
+        column = self.dataset.columns["amount"]
+        self.assertEqual(column[2], 1)
+        self.assertEqual(column[-1], 1)
+        self.assertEqual(column[:2], [3, None])
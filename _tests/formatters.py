@@ -0,0 +1,234 @@
+from unittest import skipIf
+
+import mock
+from django import test
+
+from ginger.formatters import base
+from ginger.formatters.base import FormattedObject, FormattedTable, Formatter
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class Item(object):
+
+    def __init__(self, name, price):
+        self.name = name
+        self.price = price
+
+
+class ItemTable(FormattedTable):
+    name = Formatter()
+    price = Formatter(label="Cost")
+    code = Formatter(variants="detail")
+
+
+class ItemObject(FormattedObject):
+    name = Formatter()
+    price = Formatter(hidden=True)
+
+
+class TestFormatterPlan(test.SimpleTestCase):
+
+    def test_cached_per_variant(self):
+        with mock.patch.object(base.inspect, "getmembers", wraps=base.inspect.getmembers) as getmembers:
+            for variant in (None, None, "list", "list"):
+                ItemTable([], variant=variant)
+            self.assertEqual(getmembers.call_count, 2)
+        self.assertEqual([n for n, _ in Formatter.extract_from(ItemTable)], ["name", "price"])
+        self.assertEqual(list(ItemTable([], variant="detail").columns.keys()), ["name", "price", "code"])
+
+    def test_lazy_cells(self):
+        table = ItemTable([Item("pen", 3), Item("ink", 5)])
+        row = next(iter(table))
+        self.assertEqual(row.cells, {})
+        self.assertEqual(str(row["price"]), "3")
+        self.assertEqual(list(row.cells), ["price"])
+        self.assertIs(row["price"], row["price"])
+        self.assertEqual([c.label for c in row], ["Name", "Cost"])
+        self.assertEqual(list(row.data), ["name", "price"])
+
+    def test_object(self):
+        obj = ItemObject(Item("pen", 3))
+        self.assertEqual([str(c) for c in obj], ["pen"])
+        self.assertEqual(obj["name"].value, "pen")
+        self.assertRaises(AttributeError, lambda: obj["price"])
+
+
+class TestAccessors(test.SimpleTestCase):
+
+    def test_paths(self):
+        source = Item({"code": Item("x", 1)}, 2)
+        self.assertEqual(base.compile_accessor("name__code__price")(source), 1)
+        self.assertEqual(base.compile_accessor("price")({"price": 4}), 4)
+        self.assertIs(base.compile_accessor("price"), base.compile_accessor("price"))
+        self.assertRaises(AttributeError, base.compile_accessor("missing"), source)
+
+    def test_memoized_cell(self):
+        class PreparedTable(ItemTable):
+            def prepare_name(self, obj):
+                return obj.name.upper()
+
+        prop = mock.Mock(wraps=Formatter())
+        row = next(iter(PreparedTable([Item("pen", 3)])))
+        cell = base.FormattedValue("price", prop, row.source, owner=row.table)
+        self.assertEqual((str(cell), str(cell), cell.value), ("3", "3", 3))
+        self.assertEqual((prop.extract.call_count, prop.format.call_count), (1, 1))
+        self.assertEqual(str(row["name"]), "PEN")
+
+
+class TestQuerySetPlan(test.TestCase):
+
+    def test_plan(self):
+        from django.contrib.auth.models import Group, Permission
+        from ginger.formatters.models import get_queryset_plan
+        self.assertEqual(get_queryset_plan(Permission, ["name", "content_type__app_label"]),
+                         (["content_type"], [], ["content_type__app_label", "name"]))
+        self.assertEqual(get_queryset_plan(Permission, ["content_type", "content_type__model"]),
+                         (["content_type"], [], ["content_type"]))
+        self.assertEqual(get_queryset_plan(Group, ["name", "permissions__content_type", "natural_key"]),
+                         ([], ["permissions", "permissions__content_type"], None))
+        self.assertEqual(get_queryset_plan(Permission, ["name", "content_type_id"]),
+                         ([], [], ["content_type_id", "name"]))
+
+    def test_attname_table(self):
+        from django.contrib.auth.models import Permission
+        from ginger.formatters.models import table_formatter_factory
+        table_class = table_formatter_factory(Permission, fields=["name"], content_type_id=Formatter())
+        table = table_class(Permission.objects.all()[:3])
+        rows = list(table)
+        self.assertEqual(str(rows[0]["content_type_id"]), str(Permission.objects.all()[0].content_type_id))
+
+    def test_table_queries(self):
+        from django.contrib.auth.models import Permission
+        from ginger.formatters.models import table_formatter_factory
+        from ginger.paginator import GingerPaginator
+        table_class = table_formatter_factory(Permission, fields=["name", "codename", "content_type",
+                                                                  "content_type__app_label"])
+        page = GingerPaginator(Permission.objects.all(), per_page=5).page(1)
+        object_list = page.object_list
+        deferred = type("DeferredTable", (table_class,), {"defer_unused_fields": True})(page)
+        self.assertTrue(deferred.source.object_list.query.deferred_loading[0])
+        table = table_class(page)
+        self.assertIs(page.object_list, object_list)
+        self.assertEqual(table.source.object_list.query.deferred_loading, (frozenset(), True))
+        with self.assertNumQueries(1):
+            rows = [[str(cell) for cell in row] for row in table]
+            self.assertEqual(table.source.object_list[0].codename, rows[0][1])
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0][3], table.source.object_list[0].content_type.app_label)
+
+
+class TestFooterAggregates(test.TestCase):
+
+    def test_objects(self):
+        class TotalTable(ItemTable):
+            price = Formatter(aggregate=["sum", "max"])
+
+        table = TotalTable([Item("pen", 3), Item("ink", None), Item("nib", 5)])
+        rows = list(table.footer)
+        self.assertEqual([r.source.label for r in rows], ["Total", "Maximum"])
+        self.assertEqual([str(r["price"]) for r in rows], ["8", "5"])
+        self.assertEqual([str(r["name"]) for r in rows], ["Total", "Maximum"])
+        self.assertRaises(ValueError, Formatter, aggregate="median")
+
+    def test_queryset(self):
+        from django.contrib.auth.models import Permission
+        from ginger.paginator import GingerPaginator
+
+        class PermissionTable(FormattedTable):
+            name = Formatter()
+            content_type_id = Formatter(aggregate=["count", "min"])
+
+        queryset = Permission.objects.filter(content_type__app_label="auth")
+        page = GingerPaginator(queryset.order_by("pk"), per_page=2).page(1)
+        with self.assertNumQueries(1):
+            aggregates = PermissionTable(page).compute_aggregates()
+        self.assertEqual(aggregates["count"], {"content_type_id": queryset.count()})
+        self.assertEqual(aggregates["min"]["content_type_id"], min(p.content_type_id for p in queryset))
+
+    def test_prepare_hooks(self):
+        class DoubleTable(ItemTable):
+            price = Formatter(aggregate="sum")
+
+            def prepare_price(self, obj):
+                return obj.price * 2
+
+        table = DoubleTable([Item("pen", 3), Item("nib", 5)])
+        self.assertEqual([str(r["price"]) for r in table], ["6", "10"])
+        self.assertEqual([(str(r["name"]), str(r["price"])) for r in table.footer], [("Total", "16")])
+
+    def test_queryset_column_fallback(self):
+        from django.contrib.auth.models import Permission
+
+        class PermissionTable(FormattedTable):
+            codename = Formatter(hidden=True)
+            name = Formatter()
+            content_type_id = Formatter(aggregate="count")
+            name_size = Formatter(aggregate="max")
+
+        queryset = Permission.objects.all()
+        try:
+            Permission.name_size = property(lambda self: len(self.name))
+            with self.assertNumQueries(2):
+                aggregates = PermissionTable(queryset).compute_aggregates()
+            rows = list(PermissionTable(queryset).footer)
+        finally:
+            del Permission.name_size
+        self.assertEqual(aggregates["count"], {"content_type_id": queryset.count()})
+        self.assertEqual(aggregates["max"], {"name_size": max(len(p.name) for p in queryset)})
+        self.assertEqual([str(r["name"]) for r in rows], ["Count", "Maximum"])
+
+
+class TestStreamingExport(test.TestCase):
+
+    def test_csv_and_ndjson(self):
+        class ExportTable(ItemTable):
+            secret = Formatter(hidden=True)
+
+        items = [Item("pen", 3), Item("ink", None), Item("nib", 5)]
+        for item in items:
+            item.secret = "x"
+        table = ExportTable(items)
+        chunks = list(table.stream_csv(header=True, hidden=False, chunk_size=2))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual("".join(chunks).splitlines(), ["Name,Cost", "pen,3", "ink,", "nib,5"])
+        self.assertEqual("".join(table.stream_csv()).splitlines()[0], "pen,3,x")
+        lines = list(table.stream_ndjson())[0].splitlines()
+        self.assertEqual(lines[1], '{"name":"ink","price":null,"secret":"x"}')
+        response = table.export_response("ndjson", filename="items")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="items.ndjson"')
+        self.assertRaises(ValueError, table.export_response, "pdf")
+
+    @skipIf(openpyxl is None, "openpyxl is not installed")
+    def test_xlsx(self):
+        from datetime import date
+        from decimal import Decimal
+        from io import BytesIO
+
+        class ExportTable(ItemTable):
+            day = Formatter()
+
+        items = [Item("pen", Decimal("3.25")), Item("ink", None)]
+        for item in items:
+            item.day = date(2020, 1, 2)
+        content = b"".join(ExportTable(items).stream_xlsx(header=True))
+        sheet = openpyxl.load_workbook(BytesIO(content)).active
+        rows = [[cell.value for cell in row] for row in sheet.iter_rows()]
+        self.assertEqual(rows[0], ["Name", "Cost", "Day"])
+        self.assertEqual(rows[1][:2], ["pen", 3.25])
+        self.assertEqual(rows[1][2].date(), date(2020, 1, 2))
+        self.assertIsNone(rows[2][1])
+
+    def test_queryset_chunks(self):
+        from django.contrib.auth.models import Group, Permission
+        from ginger.formatters.models import table_formatter_factory
+        for i in range(5):
+            Group.objects.create(name="g%d" % i).permissions.set(Permission.objects.all()[i:i + 2])
+        table_class = table_formatter_factory(Group, fields=["name", "permissions__codename"])
+        table = table_class(Group.objects.order_by("pk"))
+        with self.assertNumQueries(4):
+            rows = list(table.iter_export_rows(table.get_export_columns(), chunk_size=2))
+        self.assertEqual([str(cells[0]) for cells in rows], ["g%d" % i for i in range(5)])
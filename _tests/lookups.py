@@ -0,0 +1,111 @@
+import mock
+from django import test
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+
+from ginger.datasets.lookups import ListQuerySet, SortedIndex
+
+
+class Person(object):
+
+    def __init__(self, pk, name, age):
+        self.pk = pk
+        self.name = name
+        self.age = age
+
+    def __repr__(self):
+        return "Person(%r)" % self.pk
+
+
+class TestListQuerySet(test.SimpleTestCase):
+
+    def setUp(self):
+        names = ["ram", "shyam", "pico", "raj"]
+        self.people = [Person(i, names[i % 4], i % 7) for i in range(50)]
+        self.plain = ListQuerySet(self.people)
+        self.indexed = ListQuerySet(self.people).add_index("name").add_index("age", sorted=True)
+
+    def assertSame(self, func):
+        self.assertEqual(list(func(self.plain)), list(func(self.indexed)))
+
+    def test_indexed_lookups(self):
+        self.assertSame(lambda q: q.filter(name="ram").all())
+        self.assertSame(lambda q: q.filter(name__in=["ram", "pico", "ram"]).all())
+        self.assertSame(lambda q: q.filter(age__gt=3).all())
+        self.assertSame(lambda q: q.filter(age__lte=3, name="raj").all())
+        self.assertSame(lambda q: q.filter(Q(name="ram") | Q(age=1)).all())
+
+    def test_ordering(self):
+        self.assertSame(lambda q: q.order_by("-age", "pk").all())
+        self.assertSame(lambda q: q.order_by("-age")[5:15])
+        self.assertSame(lambda q: q.filter(name="pico").order_by("age", "-pk")[2:6])
+        self.assertEqual(self.plain.order_by("name").filter(age=0)[0].name, "pico")
+
+    def test_count(self):
+        self.assertEqual(self.indexed.filter(name="ram").count(), 13)
+        self.assertEqual(self.indexed.filter(age__gte=5).count(), self.plain.filter(age__gte=5).count())
+        self.assertEqual(len(self.plain), 50)
+
+    def test_slicing(self):
+        self.assertEqual(self.plain[3:5], self.people[3:5])
+        self.assertEqual(self.plain[-1], self.people[-1])
+        self.assertRaises(IndexError, lambda: self.plain.filter(name="nobody")[0])
+
+    def test_update_reindexes(self):
+        self.indexed.filter(name="ram").update(age=100)
+        self.assertEqual(self.indexed.filter(age__gte=100).count(), 13)
+        self.assertEqual(self.indexed.filter(age=100).order_by("-pk")[0].pk, 48)
+
+    def test_values(self):
+        queryset = self.indexed.filter(name="pico").order_by("-pk")
+        self.assertEqual(queryset.values_list("pk", flat=True)[:3], [46, 42, 38])
+        self.assertEqual(queryset.values("pk", "age")[0], {"pk": 46, "age": 4})
+        self.assertEqual(list(queryset.values_list("name", "age").distinct())[:2], [("pico", 4), ("pico", 0)])
+        self.assertEqual(queryset.values_list("age", flat=True).distinct().count(), 7)
+        self.assertEqual(list(queryset.iterator(chunk_size=10)), queryset.all())
+
+    def test_aggregate(self):
+        result = self.plain.filter(name="ram").aggregate(Sum("age"), count=Count("*"), oldest=Max("age"),
+                                                         ages=Count("age", distinct=True), mean=Avg("pk"))
+        self.assertEqual(result, {"age__sum": 39, "count": 13, "oldest": 6, "ages": 7, "mean": 24})
+        self.assertEqual(self.plain.none().aggregate(total=Sum("age"), n=Count("pk")), {"total": None, "n": 0})
+
+    def test_annotate(self):
+        groups = self.plain.values("name").annotate(total=Count("pk"), youngest=Min("age"))
+        self.assertEqual(groups.count(), 4)
+        self.assertEqual(groups.get(name="shyam"), {"name": "shyam", "total": 13, "youngest": 0})
+        ordered = self.plain.values_list("name").annotate(total=Count("pk")).order_by("-total", "name")
+        self.assertEqual(list(ordered), [("ram", 13), ("shyam", 13), ("pico", 12), ("raj", 12)])
+        self.assertRaises(TypeError, self.plain.annotate, total=Count("pk"))
+
+    def test_mappings(self):
+        rows = [{"pk": p.pk, "name": p.name, "info": {"age": p.age}} for p in self.people]
+        indexed = ListQuerySet(rows).add_index("name").add_index("info__age", sorted=True)
+        for queryset in (ListQuerySet(rows), indexed):
+            self.assertEqual([r["pk"] for r in queryset.order_by("-info__age", "pk")[:3]], [6, 13, 20])
+            self.assertEqual([r["pk"] for r in queryset.order_by("-info__age")[:3]], [6, 13, 20])
+            self.assertEqual(queryset.filter(name="ram").count(), 13)
+            self.assertEqual(queryset.aggregate(oldest=Max("info__age")), {"oldest": 6})
+
+    def test_null_ordering(self):
+        for person in self.people[::5]:
+            person.age = None
+        indexed = ListQuerySet(self.people).add_index("age", sorted=True)
+        for ordering in (["age"], ["-age"], ["-age", "pk"], ["age", "-pk"]):
+            expected = [p.pk for p in indexed.order_by(*ordering)]
+            self.assertEqual([p.pk for p in self.plain.order_by(*ordering)], expected)
+            self.assertEqual([p.pk for p in self.plain.order_by(*ordering)[:12]], expected[:12])
+        self.assertEqual(self.plain.order_by("age")[0].pk, 0)
+        self.assertEqual(self.plain.order_by("-age")[49].pk, 45)
+
+    def test_nested_index(self):
+        rows = [{"pk": p.pk, "info": {"age": p.age}} for p in self.people]
+        indexed = ListQuerySet(rows).add_index("info__age", sorted=True)
+        with mock.patch.object(SortedIndex, "lookup", autospec=True, side_effect=SortedIndex.lookup) as lookup:
+            self.assertEqual(indexed.filter(info__age__gte=5).count(), 14)
+            self.assertEqual([r["pk"] for r in indexed.filter(info__age=6)], [6, 13, 20, 27, 34, 41, 48])
+        self.assertEqual([c[0][1:] for c in lookup.call_args_list], [("gte", 5), ("exact", 6)])
+
+    def test_paginator(self):
+        from ginger.paginator import GingerPaginator
+        page = GingerPaginator(self.indexed.filter(age__gte=3).order_by("pk"), 10).page(2)
+        self.assertEqual([p.pk for p in page.object_list], [19, 20, 24, 25, 26, 27, 31, 32, 33, 34])
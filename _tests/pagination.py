@@ -51,3 +51,115 @@ class TestGingerPaginator(test.SimpleTestCase):
 
 
 
+
+class TestKeysetPagination(test.SimpleTestCase):
+
+    def setUp(self):
+        from ginger.datasets.lookups import ListQuerySet
+        self.factory = test.RequestFactory()
+        self.items = [mock.Mock(pk=i, score=i % 5) for i in range(23)]
+        self.queryset = ListQuerySet(self.items).order_by("-score")
+        self.expected = sorted(self.items, key=lambda o: (-o.score, -o.pk))
+
+    def walk(self, paginator, cursor=None, forward=True):
+        pages = []
+        while True:
+            page = paginator.page({"cursor": cursor} if cursor else {})
+            pages.append([o.pk for o in page.object_list])
+            cursor = page.next_cursor if forward else page.previous_cursor
+            if cursor is None:
+                return pages, page
+
+    def test_forward_and_back(self):
+        paginator = GingerPaginator(self.queryset, per_page=5, keyset=True, parameter_name="cursor")
+        self.assertEqual(paginator.get_keyset_ordering(), ["-score", "-pk"])
+        pages, last = self.walk(paginator)
+        self.assertEqual(sum(pages, []), [o.pk for o in self.expected])
+        self.assertEqual(len(pages[-1]), 3)
+        back, first = self.walk(paginator, last.previous_cursor, forward=False)
+        self.assertEqual(back, pages[-2::-1])
+        self.assertFalse(first.has_previous())
+        self.assertNotIn("count", paginator.__dict__)
+
+    def test_links_and_serializer(self):
+        from ginger import serializer
+        paginator = GingerPaginator(self.queryset, per_page=10, keyset=True)
+        request = self.factory.get("/", {"page": paginator.page({}).next_cursor})
+        page = paginator.page(request)
+        self.assertEqual([l.content for l in page.build_links(request)], ["Previous", "Next"])
+        self.assertEqual(parse_url(page.next_link(request).url)["page"], [page.next_cursor])
+        data = serializer.process_page(page)
+        self.assertEqual(data["size"], 10)
+        self.assertEqual(data["next"], page.next_cursor)
+        self.assertNotIn("total", data)
+
+    def test_invalid_cursor(self):
+        from ginger.paginator import InvalidCursor
+        paginator = GingerPaginator(self.queryset, per_page=5, keyset=True)
+        self.assertRaises(InvalidCursor, paginator.page, {"page": "not-a-cursor"})
+
+
+class TestCountStrategies(test.TestCase):
+
+    def queryset(self):
+        from django.contrib.auth.models import Permission
+        return Permission.objects.order_by("pk")
+
+    def test_exact(self):
+        from ginger import serializer
+        page = GingerPaginator(list(range(25)), per_page=10).page(3)
+        data = serializer.process_page(page)
+        self.assertEqual((data["total"], data["exact"]), (25, True))
+
+    def test_cached(self):
+        from ginger.paginator import CachedCount
+        strategy = CachedCount(timeout=60)
+        total = self.queryset().count()
+        paginator = GingerPaginator(self.queryset(), per_page=5, count_strategy=strategy)
+        self.assertEqual((paginator.count, paginator.count_is_exact), (total, True))
+        paginator = GingerPaginator(self.queryset().order_by("-pk"), per_page=5, count_strategy=strategy)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, total)
+        self.assertFalse(paginator.count_is_exact)
+        empty = GingerPaginator(self.queryset().none(), per_page=5, count_strategy="cached")
+        self.assertEqual(empty.count, 0)
+
+    def test_estimated(self):
+        from ginger.paginator import EstimatedCount
+        paginator = GingerPaginator(self.queryset(), per_page=5, count_strategy=EstimatedCount)
+        self.assertEqual(paginator.count, self.queryset().count())
+        self.assertTrue(paginator.count_is_exact)
+        with mock.patch.object(EstimatedCount, "estimate", return_value=2):
+            paginator = GingerPaginator(self.queryset(), per_page=1,
+                                        count_strategy=EstimatedCount(threshold=1))
+            page = paginator.page(3)
+            self.assertFalse(paginator.count_is_exact)
+            self.assertEqual(list(page.object_list), list(self.queryset()[2:3]))
+
+    def test_search_view(self):
+        from django import forms
+        from django.contrib.auth.models import AnonymousUser
+        from ginger.forms import GingerSearchForm
+        from ginger.paginator import EstimatedCount
+        from ginger.views import GingerSearchView
+        queryset = self.queryset()
+
+        class PermissionSearchForm(GingerSearchForm):
+            name = forms.CharField(required=False)
+
+            def get_queryset(self, **kwargs):
+                return queryset
+
+        class PermissionSearchView(GingerSearchView):
+            form_class = PermissionSearchForm
+            page_count_strategy = EstimatedCount(threshold=1)
+            per_page = 2
+
+        request = test.RequestFactory().get("/", {"page": 2})
+        request.user = AnonymousUser()
+        view = PermissionSearchView(request=request, args=(), kwargs={})
+        view.user = request.user
+        with mock.patch.object(EstimatedCount, "estimate", return_value=3):
+            page = view.get_form(view.get_form_key(), data=request.GET).run()
+        self.assertFalse(page.paginator.count_is_exact)
+        self.assertEqual(list(page.object_list), list(queryset[2:4]))
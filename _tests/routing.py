@@ -0,0 +1,129 @@
+from django import test
+from django.conf.urls import include, url
+from django.core.urlresolvers import (
+    RegexURLResolver, Resolver404, NoReverseMatch, clear_url_caches, get_resolver, set_script_prefix
+)
+from django.core.urlresolvers import reverse as django_reverse
+from django.test.utils import override_settings
+
+from ginger import urlcache
+
+from ginger.conf.urls import TrieURLResolver
+from ginger.pattern import Pattern
+
+
+def endpoint(request, **kwargs):
+    pass
+
+
+def make_urls(values):
+    urls = []
+    for i, value in enumerate(values):
+        source = Pattern(value)
+        pattern = url(source.create(), endpoint, name="view_%d" % i)
+        pattern.source_pattern = source
+        urls.append(pattern)
+    return urls
+
+
+PATTERNS = [
+    "",
+    "users/",
+    "users/id:int/",
+    "users/id:int/edit/",
+    "users/username:slug/",
+    "users/new/",
+    "pages/slug?:slug/",
+    "files/path:*",
+    "tags/kind:(red, green)/",
+    "codes/code:alnum{3}/",
+    "archive/year:int/month?:int",
+    "about.html",
+    "raw/path:.+",
+    r"names/name:\S+/",
+]
+
+
+class TestTrieURLResolver(test.SimpleTestCase):
+
+    def setUp(self):
+        urls = make_urls(PATTERNS) + [url(r"^legacy/(\d+)/$", endpoint, name="legacy")]
+        self.linear = RegexURLResolver(r"^/", urls)
+        self.trie = RegexURLResolver(r"^/", [TrieURLResolver(urls)])
+
+    def resolve(self, resolver, path):
+        try:
+            match = resolver.resolve(path)
+        except Resolver404:
+            return None
+        return match.url_name, match.args, match.kwargs
+
+    def test_same_as_linear(self):
+        paths = ["/", "/users/", "/users/12/", "/users/12/edit/", "/users/ram-1/", "/users/new/",
+                 "/pages/", "/pages/intro/", "/files/a/b/c.txt", "/tags/red/", "/tags/blue/",
+                 "/codes/ab1/", "/archive/2020/", "/archive/2020/5", "/about.html", "/aboutxhtml",
+                 "/legacy/4/", "/users/12/delete/", "/nothing", "/users//",
+                 "/raw/a/b", "/names/a.b/", "/names/a/b/"]
+        for path in paths:
+            self.assertEqual(self.resolve(self.trie, path), self.resolve(self.linear, path), path)
+        self.assertEqual(self.resolve(self.trie, "/users/new/")[0], "view_4")
+        self.assertEqual(self.resolve(self.trie, "/raw/a/b"), ("view_12", (), {'path': 'a/b'}))
+
+    def test_candidates(self):
+        trie = self.trie.url_patterns[0].trie
+        self.assertEqual(trie.fallback, [7, 11, 12, 13, 14])
+        self.assertEqual(trie.candidates("users/12/edit/"), [3, 7, 11, 12, 13, 14])
+
+    def test_reverse(self):
+        self.assertEqual(self.trie.reverse("view_3", id=5), self.linear.reverse("view_3", id=5))
+        self.assertEqual(self.trie.reverse("legacy", 4), "legacy/4/")
+
+
+urlpatterns = make_urls(PATTERNS) + [
+    url(r"^legacy/(\d+)/$", endpoint, name="legacy"),
+    url(r"^defaults/(?P<page>\d+)/$", endpoint, {"kind": "a"}, name="defaults"),
+    url(r"^ns/", include([url(r"^(?P<id>\d+)/$", endpoint, name="item")], namespace="ns")),
+]
+
+
+@override_settings(ROOT_URLCONF="_tests.routing")
+class TestReverseCache(test.SimpleTestCase):
+
+    def assertSameReverse(self, name, *args, **kwargs):
+        self.assertEqual(urlcache.reverse(name, args=args, kwargs=kwargs),
+                         django_reverse(name, args=args, kwargs=kwargs))
+
+    def test_same_as_django(self):
+        for i in range(2):
+            self.assertSameReverse("view_0")
+            self.assertSameReverse("view_3", id=5)
+            self.assertSameReverse("view_3", 5)
+            self.assertSameReverse("view_4", username="ram-1")
+            self.assertSameReverse("view_7", path="a b/r\u00e4m?x=1%")
+            self.assertSameReverse("view_6")
+            self.assertSameReverse("view_6", slug="intro")
+            self.assertSameReverse("view_8", kind="green")
+            self.assertSameReverse("legacy", 4)
+            self.assertSameReverse("defaults", page=2, kind="a")
+            self.assertSameReverse("ns:item", id=3)
+            self.assertSameReverse(endpoint, 4)
+
+    def test_failures(self):
+        for i in range(2):
+            self.assertRaises(NoReverseMatch, urlcache.reverse, "view_3", kwargs={"id": "x"})
+            self.assertRaises(NoReverseMatch, urlcache.reverse, "view_8", kwargs={"kind": "blue"})
+            self.assertRaises(NoReverseMatch, urlcache.reverse, "defaults", kwargs={"page": 2, "kind": "b"})
+            self.assertRaises(NoReverseMatch, urlcache.reverse, "missing")
+        self.assertRaises(ValueError, urlcache.reverse, "view_3", args=[1], kwargs={"id": 1})
+
+    def test_invalidation(self):
+        self.assertEqual(urlcache.reverse("view_1"), "/users/")
+        resolver = get_resolver()
+        self.assertEqual(len(urlcache.get_formatters(resolver, "view_1", "/")), 1)
+        clear_url_caches()
+        self.assertNotIn(get_resolver(), urlcache._caches)
+        set_script_prefix("/app/")
+        try:
+            self.assertEqual(urlcache.reverse("view_1"), "/app/users/")
+        finally:
+            set_script_prefix("/")
@@ -2,7 +2,9 @@ from django.core.files.base import File
 from django.core.files.storage import FileSystemStorage
 from os.path import join as joinpath, dirname
 from django import test
-from ginger.views.storages import  StorageFile
+from django.http import HttpResponse, QueryDict
+from ginger.models import AbstractWizardStep
+from ginger.views.storages import  StorageFile, CacheFormStorage, CookieFormStorage, ModelFormStorage
 
 MEDIA_ROOT = joinpath(dirname(__file__), "media")
 
@@ -20,3 +22,101 @@ class TestStorageFile(test.SimpleTestCase):
         print(self.file.data)
 
 
+
+
+class WizardStep(AbstractWizardStep):
+
+    class Meta:
+        app_label = "ginger"
+
+
+class WizardStepStorage(ModelFormStorage):
+    model = WizardStep
+
+
+class FakeWizard(object):
+
+    def __init__(self, request):
+        self.request = request
+        self.file_storage = FileSystemStorage(MEDIA_ROOT)
+
+    @classmethod
+    def class_oid(cls):
+        return "wizard"
+
+    def get_step_names(self):
+        return ["one", "two"]
+
+
+class TestStepFormStorage(test.SimpleTestCase):
+
+    def create_request(self, cookies=None):
+        from django.contrib.sessions.backends.signed_cookies import SessionStore
+        request = test.RequestFactory().get("/")
+        request.session = getattr(self, "session", None) or SessionStore()
+        self.session = request.session
+        request.COOKIES.update(cookies or {})
+        return request
+
+    def roundtrip(self, storage_class, request=None):
+        storage = storage_class(FakeWizard(request or self.create_request()))
+        self.assertEqual(storage.get("one"), (None, None))
+        storage.set("one", QueryDict("a=1&a=2&b=3"), {})
+        self.assertEqual(storage.get("one")[0].getlist("a"), ["1", "2"])
+        return storage
+
+    @test.override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_cache(self):
+        self.roundtrip(CacheFormStorage)
+        storage = CacheFormStorage(FakeWizard(self.create_request()))
+        self.assertEqual(storage.get("one")[0].getlist("a"), ["1", "2"])
+        storage.clear()
+        self.assertEqual(storage.get("one"), (None, None))
+        self.assertIsNone(CacheFormStorage(FakeWizard(self.create_request())).load_step("one"))
+
+    def test_cookie(self):
+        storage = self.roundtrip(CookieFormStorage)
+        response = HttpResponse()
+        storage.update_response(response)
+        cookies = {k: v.value for k, v in response.cookies.items()}
+        self.assertEqual(list(cookies), ["wizard-steps-one"])
+        storage = CookieFormStorage(FakeWizard(self.create_request(cookies)))
+        self.assertEqual(storage.get("one")[0].getlist("a"), ["1", "2"])
+        self.assertEqual(storage.get("two"), (None, None))
+        storage.clear()
+        response = HttpResponse()
+        storage.update_response(response)
+        self.assertEqual(response.cookies["wizard-steps-one"]["max-age"], 0)
+        cookies["wizard-steps-one"] += "x"
+        self.assertEqual(CookieFormStorage(FakeWizard(self.create_request(cookies))).get("one"), (None, None))
+
+    def test_cookie_cleared_before_response(self):
+        storage = self.roundtrip(CookieFormStorage)
+        storage.clear()
+        response = HttpResponse()
+        storage.update_response(response)
+        self.assertEqual(list(response.cookies), [])
+
+
+class TestModelFormStorage(test.TestCase):
+
+    def test_roundtrip(self):
+        from django.contrib.sessions.backends.signed_cookies import SessionStore
+        from django.utils import timezone
+        request = test.RequestFactory().get("/")
+        request.session = SessionStore()
+        storage = WizardStepStorage(FakeWizard(request))
+        self.assertEqual(storage.get("one"), (None, None))
+        storage.set("one", QueryDict("a=1&a=2"), {})
+        storage.set("one", QueryDict("a=3"), {})
+        self.assertEqual(WizardStep.objects.count(), 1)
+        storage = WizardStepStorage(FakeWizard(request))
+        self.assertEqual(storage.get("one")[0].getlist("a"), ["3"])
+        WizardStep.objects.update(expires=timezone.now())
+        self.assertEqual(WizardStepStorage(FakeWizard(request)).get("one"), (None, None))
+        WizardStepStorage.delete_expired()
+        self.assertFalse(WizardStep.objects.exists())
+        storage.set("two", QueryDict("b=1"), {})
+        storage.clear()
+        self.assertFalse(WizardStep.objects.exists())
+        self.assertNotIn(storage.step_key, request.session)
@@ -3,6 +3,7 @@ from django import test
 from django.utils import six
 
 from ginger import utils
+from ginger.views import GingerTemplateView
 
 
 
@@ -89,4 +90,33 @@ class TestQualifiedName(test.SimpleTestCase):
 
     def test_class(self):
         name = utils.qualified_name(TestQualifiedName)
-        self.assertIsNotNone(name)
\ No newline at end of file
+        self.assertIsNotNone(name)
+
+class TestArgSpec(test.SimpleTestCase):
+
+    def test_method(self):
+        spec = utils.get_argspec(TestPageContext.View().get_page_heading)
+        self.assertEqual(spec.args, ("self",))
+        self.assertIs(spec, utils.get_argspec(TestPageContext.View.get_page_heading))
+
+    def test_varargs(self):
+        spec = utils.get_argspec(lambda a, *args, **kwargs: None)
+        self.assertEqual(spec, (("a",), "args", "kwargs"))
+
+
+class TestPageContext(test.SimpleTestCase):
+
+    class View(GingerTemplateView):
+        page_title = "Title"
+        template_name = "page.html"
+
+        def get_page_heading(self):
+            return "Heading"
+
+    def test_render(self):
+        view = self.View()
+        view.request = test.RequestFactory().get("/")
+        ctx = {'page_actions': ['edit']}
+        view.render_to_response(ctx)
+        self.assertEqual((ctx['page_heading'], ctx['page_title'], ctx['page_actions']), ("Heading", "Title", ['edit']))
+        self.assertEqual([a[2] for a in self.View.get_page_context_adapters()], [False, True, True, True])
@@ -0,0 +1,90 @@
+from django import test
+from django.contrib.auth.models import AnonymousUser
+from django.http.response import HttpResponse
+
+from ginger import views
+
+
+class TestViewSetDispatch(test.SimpleTestCase):
+
+    class SampleViewSet(views.GingerViewSet):
+        url_prefix = ""
+
+        @views.view(many=True, suffix="")
+        def index(self, request):
+            return HttpResponse("index")
+
+        @views.view(methods=["post"])
+        def archive(self, request):
+            return HttpResponse("archived")
+
+        def helper(self):
+            pass
+
+    def call(self, view_class, action, method="get"):
+        request = getattr(test.RequestFactory(), method)("/")
+        request.user = AnonymousUser()
+        return view_class.as_view(action=action)(request)
+
+    def test_table(self):
+        self.assertEqual(list(self.SampleViewSet.subview_table), ["archive", "index"])
+        self.assertEqual([s.name for s in self.SampleViewSet.get_subviews()], ["archive", "index"])
+        self.assertEqual(self.SampleViewSet.subview_table["archive"].methods, ("POST",))
+        self.assertEqual(len(self.SampleViewSet.as_urls()), 2)
+
+    def test_methods(self):
+        self.assertEqual(self.call(self.SampleViewSet, "index").content, b"index")
+        self.assertEqual(self.call(self.SampleViewSet, "archive").status_code, 405)
+        self.assertEqual(self.call(self.SampleViewSet, "archive", "post").content, b"archived")
+
+    def test_permissions_first(self):
+        from django.core.exceptions import PermissionDenied
+        from django.http.response import Http404
+
+        class PrivateViewSet(self.SampleViewSet):
+            def check_user_permissions(self):
+                raise PermissionDenied
+
+        self.assertRaises(PermissionDenied, self.call, PrivateViewSet, "archive")
+        self.assertRaises(PermissionDenied, self.call, PrivateViewSet, "missing")
+        self.assertRaises(Http404, self.call, self.SampleViewSet, "missing")
+        self.assertRaises(Http404, self.call, self.SampleViewSet, "helper")
+
+    def test_override(self):
+        class ChildViewSet(self.SampleViewSet):
+            def archive(self, request):
+                pass
+
+            @views.view
+            def helper(self, request):
+                return HttpResponse("helper")
+
+        self.assertEqual(list(ChildViewSet.subview_table), ["helper", "index"])
+        self.assertEqual(self.call(ChildViewSet, "helper").content, b"helper")
+
+
+class TestExportViewSet(test.TestCase):
+
+    class PermissionViewSet(views.ExportViewSetMixin, views.GingerModelViewSet):
+        url_prefix = ""
+
+        def get_queryset(self):
+            from django.contrib.auth.models import Permission
+            return Permission.objects.order_by("pk")
+
+    def export(self, export_format):
+        request = test.RequestFactory().get("/", {"format": export_format})
+        request.user = AnonymousUser()
+        return self.PermissionViewSet.as_view(action="export")(request)
+
+    def test_export(self):
+        from django.contrib.auth.models import Permission
+        response = self.export("csv")
+        self.assertEqual(response.status_code, 200)
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        self.assertEqual(len(content.decode("utf-8").splitlines()), Permission.objects.count() + 1)
+        self.assertIn("attachment", response["Content-Disposition"])
+
+    def test_bad_format(self):
+        from ginger.exceptions import BadRequest
+        self.assertRaises(BadRequest, self.export, "exe")
@@ -1,12 +1,159 @@
+import re
 
 from django.conf.urls import include, url
+from django.core.urlresolvers import RegexURLResolver, ResolverMatch, Resolver404
+from django.utils.encoding import force_text
+from django.utils.functional import cached_property
+
+from ginger.pattern import AlNum, Choice, Name, Num, Slug
 from ginger.views import utils
 
 
-__all__ = ('include', 'url', 'scan', 'scan_to_include')
+__all__ = ('include', 'url', 'scan', 'scan_to_include', 'URLTrie', 'TrieURLResolver')
+
+
+_literal_regex = re.compile(r"^[^.^$*+?{}\[\]\\|()]*$")
+
+
+class TrieNode(object):
+
+    __slots__ = ("literals", "params", "ends")
+
+    def __init__(self):
+        self.literals = {}
+        self.params = {}
+        self.ends = []
+
+
+class URLTrie(object):
+    """
+    Prefix tree over the "/" separated segments of url patterns generated from ginger.pattern.Pattern
+    (url objects carrying a source_pattern). Literal segments are dictionary lookups and typed
+    segments are matched against their own regex, so finding the candidate patterns for a path costs
+    time proportional to its depth. Only segments of the indexed_types are indexed; patterns with
+    other segments (raw regexes such as path:.+, "*" segments, literals with regex characters) or
+    that cannot be split into segments at all are candidates for every path.
+    """
+
+    indexed_types = (Num, Slug, Name, AlNum, Choice)
 
+    def __init__(self, patterns):
+        self.root = TrieNode()
+        self.fallback = []
+        for index, p in enumerate(patterns):
+            source = getattr(p, "source_pattern", None)
+            segments = source.segments() if source is not None else None
+            if segments is None or not self.add(segments, index):
+                self.fallback.append(index)
 
-def scan(module, predicate=None):
+    def add(self, segments, index):
+        variants = [[]]
+        for i, segment in enumerate(segments):
+            if segment.literal is not None:
+                if not _literal_regex.match(segment.literal):
+                    return False
+            elif segment.kind not in self.indexed_types:
+                return False
+            if segment.optional:
+                # absent optional segments consume nothing, except the last one which leaves ""
+                skipped = [v + ([None] if i == len(segments) - 1 else []) for v in variants]
+                variants = [v + [segment] for v in variants] + skipped
+            else:
+                variants = [v + [segment] for v in variants]
+        for variant in variants:
+            node = self.root
+            for segment in variant:
+                if segment is None or segment.literal is not None:
+                    literal = "" if segment is None else segment.literal
+                    node = node.literals.setdefault(literal, TrieNode())
+                else:
+                    try:
+                        node = node.params[segment.regex][1]
+                    except KeyError:
+                        child = TrieNode()
+                        node.params[segment.regex] = (re.compile(r"(?:%s)$" % segment.regex), child)
+                        node = child
+            node.ends.append(index)
+        return True
+
+    def candidates(self, path):
+        """
+        Indexes of the patterns that may match path, in their original order
+        """
+        parts = path.split("/")
+        size = len(parts)
+        found = list(self.fallback)
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if depth == size:
+                found.extend(node.ends)
+                continue
+            part = parts[depth]
+            child = node.literals.get(part)
+            if child is not None:
+                stack.append((child, depth + 1))
+            for regex, child in node.params.values():
+                if regex.match(part):
+                    stack.append((child, depth + 1))
+        return sorted(set(found))
+
+
+class TrieURLResolver(RegexURLResolver):
+    """
+    Resolver over a list of url patterns that only tries the patterns URLTrie finds for a path
+    instead of all of them in turn. Reversing works as for include(patterns).
+    """
+
+    def __init__(self, patterns, regex=r"^", **kwargs):
+        super(TrieURLResolver, self).__init__(regex, patterns, **kwargs)
+
+    @cached_property
+    def trie(self):
+        return URLTrie(self.url_patterns)
+
+    def resolve(self, path):
+        path = force_text(path)
+        tried = []
+        match = self.regex.search(path)
+        if match:
+            new_path = path[match.end():]
+            patterns = self.url_patterns
+            for index in self.trie.candidates(new_path):
+                pattern = patterns[index]
+                try:
+                    sub_match = pattern.resolve(new_path)
+                except Resolver404 as e:
+                    sub_tried = e.args[0].get('tried')
+                    if sub_tried is not None:
+                        tried.extend([pattern] + t for t in sub_tried)
+                    else:
+                        tried.append([pattern])
+                else:
+                    if sub_match:
+                        sub_match_dict = dict(match.groupdict(), **self.default_kwargs)
+                        sub_match_dict.update(sub_match.kwargs)
+                        sub_match_args = sub_match.args
+                        if not sub_match_dict:
+                            sub_match_args = match.groups() + sub_match.args
+                        return ResolverMatch(
+                            sub_match.func,
+                            sub_match_args,
+                            sub_match_dict,
+                            sub_match.url_name,
+                            [self.app_name] + sub_match.app_names,
+                            [self.namespace] + sub_match.namespaces,
+                        )
+                    tried.append([pattern])
+            raise Resolver404({'tried': tried, 'path': new_path})
+        raise Resolver404({'path': path})
+
+
+def scan(module, predicate=None, compiled=False):
+    """
+    Returns the url patterns of every ginger view in module. With compiled=True they are wrapped in
+    a single TrieURLResolver.
+    """
     view_classes = utils.find_views(module, predicate=predicate)
     urls = []
     for view in view_classes:
@@ -15,9 +162,10 @@ def scan(module, predicate=None):
         else:
             urls.append(view.as_url())
     pattern = urls
+    if compiled:
+        pattern = [TrieURLResolver(urls)]
     return pattern
 
 
-def scan_to_include(module, predicate=None, app_name=None, namespace=None):
-    return scan(module, predicate), app_name, namespace
-
+def scan_to_include(module, predicate=None, app_name=None, namespace=None, compiled=False):
+    return scan(module, predicate, compiled), app_name, namespace
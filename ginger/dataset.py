@@ -1,14 +1,19 @@
 from __future__ import division
 
 import copy
-import itertools
 import inspect
+import tempfile
 import weakref
 from collections import OrderedDict
 import collections
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Page
+from django.db.models.query import QuerySet
+from django.http.response import StreamingHttpResponse
 from django.utils import six
+from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
-from ginger import ui
+from ginger import ui, stats
 from ginger.utils import get_url_with_modified_params
 
 
@@ -46,7 +51,18 @@ class BoundColumn(object):
         self.column = column
         self.name = name
         self.position = position
-        self.hidden = column.hidden
+        self._hidden = column.hidden
+
+    @property
+    def hidden(self):
+        return self._hidden
+
+    @hidden.setter
+    def hidden(self, value):
+        self._hidden = value
+        columns = getattr(self.schema, "columns", None)
+        if columns is not None:
+            columns.reset()
 
     def is_hidden(self):
         return self.hidden
@@ -86,17 +102,18 @@ class BoundColumn(object):
 
     def __iter__(self):
         pos = self.position
-        data = self.schema
-        for row in data:
-            yield row[pos]
+        for row in self.schema.rows:
+            yield row.data[pos]
 
     def __len__(self):
         return len(self.schema)
 
     def __getitem__(self, item):
-        if type(item) == slice:
-            return itertools.islice(self, item.start)
-        return next(itertools.dropwhile(lambda i, _: i < item, enumerate(self)))
+        pos = self.position
+        rows = self.schema.rows
+        if isinstance(item, slice):
+            return [row.data[pos] for row in rows[item]]
+        return rows[item].data[pos]
 
     def to_json(self):
         return {
@@ -105,6 +122,9 @@ class BoundColumn(object):
             "kind": self.kind
         }
 
+    def aggregate(self, names=stats.AGGREGATES):
+        return stats.aggregate(self, names)
+
     def sort(self, key=None, reverse=False):
         i = self.position
         if key is None:
@@ -140,25 +160,27 @@ class DataRow(object):
                 obj = getattr(obj, key)
         return obj
 
+    def prepare_data(self, obj):
+        schema = self.owner()._get_schema()
+        if not inspect.isgenerator(obj) and not isinstance(obj, collections.Sequence):
+            result = []
+            for column in schema.columns:
+                attr = column.attr or column.name
+                try:
+                    method = getattr(schema, "prepare_%s" % column.name)
+                except AttributeError:
+                    value = self.prepare_attr(obj, attr)
+                else:
+                    value = method(obj)
+                result.append(value)
+        else:
+            result = obj
+        return result
+
     @property
     def data(self):
-        obj = self.obj
         if self._data is None:
-            schema = self.owner()._get_schema()
-            if not inspect.isgenerator(obj) and not isinstance(obj, collections.Sequence):
-                result = []
-                for column in schema.columns:
-                    attr = column.attr or column.name
-                    try:
-                        method = getattr(schema, "prepare_%s" % column.name)
-                    except AttributeError:
-                        value = self.prepare_attr(obj, attr)
-                    else:
-                        value = method(obj)
-                    result.append(value)
-            else:
-                result = obj
-            self._data = result
+            self._data = self.prepare_data(self.obj)
         return self._data
 
     @property
@@ -193,16 +215,20 @@ class DataRow(object):
             self.__dict__[key] = value
         else:
             col = self.columns[key]
-            data = list(self.data)
-            data[col.position] = value
-            self.__dict__['_data'] = tuple(data)
+            self.set_value(col.position, value)
+
+    def set_value(self, position, value):
+        data = list(self.data)
+        data[position] = value
+        self.__dict__['_data'] = tuple(data)
 
     def __iter__(self):
         """
         iterates over non-hidden columns only
         """
+        data = self.data
         for col in self.columns.visible():
-            yield self.data[col.position]
+            yield data[col.position]
 
     def __len__(self):
         return len(self.columns.visible())
@@ -251,15 +277,22 @@ class DataSetBase(object):
         if inspect.isgenerator(items):
             items = list(items)
         self.object_list = items
-        for d in items:
+        for d in self.iter_source(items):
             self.append(d)
 
+    def iter_source(self, items):
+        return items
+
     def insert(self, i, data):
         row = self._make_row(data)
         self.rows.insert(i, row)
 
+    @property
+    def row_class(self):
+        return self.schema.datarow_class
+
     def _make_row(self, obj):
-        row_class = self.schema.datarow_class
+        row_class = self.row_class
         if isinstance(obj, row_class):
             return obj
         return row_class(self, obj)
@@ -289,24 +322,101 @@ class DataAggregates(DataSetBase):
     def _get_schema(self):
         return self._schema()
 
+    @property
+    def row_class(self):
+        schema = self.schema
+        return schema.aggregaterow_class or schema.datarow_class
+
     def _make_row(self, obj):
         row = super(DataAggregates, self)._make_row(obj)
         row.is_aggregate = True
         return row
 
 
+def _resetting(method):
+    def func(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.reset()
+        return result
+    func.__name__ = method.__name__
+    return func
+
+
 class DictList(list):
+    """
+    List of columns that can also be indexed by column name. The name index and the
+    visible columns are cached and rebuilt after the list or a column's hidden flag changes.
+    """
+
+    def __init__(self, *args):
+        super(DictList, self).__init__(*args)
+        self.reset()
+
+    def reset(self):
+        self.__names = None
+        self.__visible = None
 
     def __getitem__(self, item):
         if isinstance(item, six.string_types):
+            names = self.__names
+            if names is None:
+                names = self.__names = dict((col.name, col) for col in self)
             try:
-                return next(col for col in self if item == col.name)
-            except StopIteration:
+                return names[item]
+            except KeyError:
                 raise KeyError("%r is not a key" % item)
         return super(DictList, self).__getitem__(item)
 
     def visible(self):
-        return [col for col in self if not col.is_hidden()]
+        visible = self.__visible
+        if visible is None:
+            visible = self.__visible = tuple(col for col in self if not col.is_hidden())
+        return visible
+
+    append = _resetting(list.append)
+    extend = _resetting(list.extend)
+    insert = _resetting(list.insert)
+    remove = _resetting(list.remove)
+    pop = _resetting(list.pop)
+    sort = _resetting(list.sort)
+    reverse = _resetting(list.reverse)
+    __setitem__ = _resetting(list.__setitem__)
+    __delitem__ = _resetting(list.__delitem__)
+    __iadd__ = _resetting(list.__iadd__)
+
+
+_queryset_plans = weakref.WeakKeyDictionary()
+
+_renderer_names = weakref.WeakKeyDictionary()
+
+
+def format_value(value, index, row):
+    return six.text_type(value) if value is not None else ""
+
+
+def resolve_field_path(model, path):
+    """
+    Walks a Column.attr path across model relations.
+    :return: (is_value, related) where is_value tells if the path ends at a
+    concrete non relational field and related lists the select_related paths
+    the path traverses
+    """
+    parts = path.split("__")
+    related = []
+    for i, part in enumerate(parts):
+        opts = model._meta
+        try:
+            field = opts.pk if part == "pk" else opts.get_field(part)
+        except FieldDoesNotExist:
+            return False, related
+        if not field.is_relation or (part == getattr(field, "attname", None) and part != field.name):
+            # the attname of a foreign key (content_type_id) is the raw column value
+            return i == len(parts) - 1 and field.concrete, related
+        if not (field.many_to_one or field.one_to_one):
+            return False, related
+        related.append("__".join(parts[:i + 1]))
+        model = field.related_model
+    return False, related
 
 
 class GingerDataSet(DataSetBase):
@@ -316,12 +426,31 @@ class GingerDataSet(DataSetBase):
 
     datarow_class = DataRow
 
+    aggregaterow_class = None
+
+    boundcolumn_class = BoundColumn
+
+    column_aggregates = None
+
+    use_values_list = False
+
+    aggregate_labels = {
+        "count": "Count",
+        "sum": "Total",
+        "mean": "Average",
+        "min": "Minimum",
+        "max": "Maximum"
+    }
+
     def __init__(self, object_list=None):
         super(GingerDataSet, self).__init__()
         self.__columns = self.setup_columns()
         self.aggregates = DataAggregates(self)
-        if object_list:
+        self.__aggregate_rows = []
+        if object_list is not None:
             self.extend(object_list)
+            if self.column_aggregates:
+                self.update_aggregates()
 
     def row_css_class(self, *args):
         return
@@ -344,11 +473,59 @@ class GingerDataSet(DataSetBase):
             col.name = name
         return OrderedDict(values)
 
+    @classmethod
+    def get_queryset_plan(cls, model):
+        """
+        Compiles the column attrs into the arguments of a single values_list() call.
+        Falls back to select_related() when a column needs the model instance, i.e.
+        it has a prepare_ method, ends at a relation or is not a model field at all.
+        :return: (fields, related) where fields is None unless values_list can be used
+        """
+        plans = _queryset_plans.get(cls)
+        if plans is None:
+            plans = _queryset_plans[cls] = {}
+        try:
+            return plans[model]
+        except KeyError:
+            pass
+        fields = []
+        related = set()
+        for name, column in six.iteritems(cls.get_column_dict()):
+            attr = column.attr or name
+            is_value, paths = resolve_field_path(model, attr)
+            related.update(paths)
+            if not is_value or hasattr(cls, "prepare_%s" % name):
+                fields = None
+            elif fields is not None:
+                fields.append(attr)
+        result = plans[model] = (fields, sorted(related))
+        return result
+
+    def prepare_queryset(self, queryset):
+        """
+        Adds select_related() for the relations the columns traverse. With use_values_list the
+        rows are fetched as values_list() tuples instead of model instances, so row.obj is a tuple.
+        """
+        if getattr(queryset, "_fields", None) is not None:
+            return queryset
+        fields, related = self.get_queryset_plan(queryset.model)
+        if fields and self.use_values_list:
+            return queryset.values_list(*fields)
+        if related:
+            return queryset.select_related(*related)
+        return queryset
+
+    def iter_source(self, items):
+        source = items.object_list if isinstance(items, Page) else items
+        if isinstance(source, QuerySet):
+            return self.prepare_queryset(source)
+        return items
+
     def setup_columns(self):
         column_dict = self.get_column_dict()
         result = DictList()
         for i, (name, column) in enumerate(six.iteritems(column_dict)):
-            col = BoundColumn(self, name, i, column)
+            col = self.boundcolumn_class(self, name, i, column)
             result.append(col)
         return result
 
@@ -356,14 +533,63 @@ class GingerDataSet(DataSetBase):
     def columns(self):
         return self.__columns
 
+    def compute_aggregates(self):
+        """
+        Computes column_aggregates, a mapping of column name -> list of aggregate names,
+        with one pass per column
+        :return: OrderedDict of aggregate name -> {column name: value}
+        """
+        spec = self.column_aggregates or {}
+        values = {}
+        for name, aggregates in six.iteritems(spec):
+            for key, value in six.iteritems(self.columns[name].aggregate(aggregates)):
+                values.setdefault(key, {})[name] = value
+        return OrderedDict((key, values[key]) for key in stats.AGGREGATES if key in values)
+
+    def update_aggregates(self):
+        """
+        Replaces the aggregate rows computed for column_aggregates by a previous call
+        """
+        rows = self.aggregates.rows
+        for row in self.__aggregate_rows:
+            rows.remove(row)
+        del self.__aggregate_rows[:]
+        columns = self.columns
+        for key, values in six.iteritems(self.compute_aggregates()):
+            data = [None] * len(columns)
+            if columns and columns[0].name not in values:
+                data[0] = self.aggregate_labels.get(key, key)
+            for name, value in six.iteritems(values):
+                data[columns[name].position] = value
+            self.__aggregate_rows.append(self.aggregates.append(data))
+
+    @classmethod
+    def get_renderer_names(cls):
+        """
+        Resolves, once per class, the render_<name> or render_<kind> method of each column
+        :return: tuple of method names (or None) indexed by column position
+        """
+        try:
+            return _renderer_names[cls]
+        except KeyError:
+            pass
+        result = []
+        for name, column in six.iteritems(cls.get_column_dict()):
+            method_name = None
+            for suffix in (name, column.kind):
+                if getattr(cls, "render_%s" % suffix, None):
+                    method_name = "render_%s" % suffix
+                    break
+            result.append(method_name)
+        result = _renderer_names[cls] = tuple(result)
+        return result
+
+    @cached_property
+    def cell_formatters(self):
+        return [getattr(self, name) if name else format_value for name in self.get_renderer_names()]
+
     def _format_cell(self, value, index, row):
-        column = self.columns[index]
-        suffixes = (column.name, column.kind)
-        for suffix in suffixes:
-            func = getattr(self, "render_%s" % suffix, None)
-            if func:
-                return func(value, index, row)
-        return six.text_type(value) if value is not None else ""
+        return self.cell_formatters[index](value, index, row)
 
     def build_links(self, request):
         data = request.GET
@@ -387,14 +613,18 @@ class GingerDataSet(DataSetBase):
             link = ui.Link(content=col.label, url=url, is_active=is_active, reverse=reverse, sortable=col.sortable, column=col)
             yield link
 
+    def iter_export_rows(self, columns):
+        for row in self.rows:
+            yield [row[col.position] for col in columns]
+
     def export_csv(self, response, header=False, hidden=True):
         import csv
         writer = csv.writer(response)
         columns = tuple(col for col in self.columns if hidden or not col.is_hidden())
         if header:
             writer.writerow([col.label for col in columns])
-        for row in self.rows:
-            writer.writerow([row[col.position] for col in columns])
+        for values in self.iter_export_rows(columns):
+            writer.writerow(values)
 
     def export_xlsx(self, response, header=False, hidden=True):
         from openpyxl import Workbook
@@ -403,10 +633,88 @@ class GingerDataSet(DataSetBase):
         sheet = book.create_sheet(index=0)
         if header:
             sheet.append([col.label for col in columns])
-        for row in self.rows:
-            sheet.append([row[col.position] for col in columns])
+        for values in self.iter_export_rows(columns):
+            sheet.append(values)
         book.save(response)
 
+    def make_stream_row(self, obj):
+        return self.datarow_class(self, obj)
+
+    def iter_stream_source(self, object_list, chunk_size):
+        source = self.iter_source(object_list)
+        if isinstance(source, QuerySet):
+            try:
+                return source.iterator(chunk_size=chunk_size)
+            except TypeError:
+                return source.iterator()
+        return source
+
+    def iter_formatted_rows(self, object_list, columns, chunk_size):
+        """
+        Formats each object of object_list through _format_cell without appending it
+        to rows, querysets are read with iterator()
+        """
+        format_cell = self._format_cell
+        for obj in self.iter_stream_source(object_list, chunk_size):
+            row = self.make_stream_row(obj)
+            data = row.data
+            yield [format_cell(data[col.position], col.position, row) for col in columns]
+
+    def stream_csv(self, object_list, header=False, hidden=True, chunk_size=500):
+        """
+        Yields csv content, one chunk of chunk_size rows at a time
+        """
+        import csv
+        columns = tuple(col for col in self.columns if hidden or not col.is_hidden())
+        buffer = six.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow([col.label for col in columns])
+        for i, values in enumerate(self.iter_formatted_rows(object_list, columns, chunk_size), 1):
+            writer.writerow(values)
+            if i % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        content = buffer.getvalue()
+        if content:
+            yield content
+
+    def stream_xlsx(self, object_list, header=False, hidden=True, chunk_size=500, block_size=64 * 1024):
+        """
+        Writes rows into a write-only workbook, which keeps them in a temporary file,
+        and yields the saved workbook in blocks of block_size bytes
+        """
+        from openpyxl import Workbook
+        book = Workbook(write_only=True)
+        columns = tuple(col for col in self.columns if hidden or not col.is_hidden())
+        sheet = book.create_sheet()
+        if header:
+            sheet.append([col.label for col in columns])
+        for values in self.iter_formatted_rows(object_list, columns, chunk_size):
+            sheet.append(values)
+        with tempfile.TemporaryFile() as fh:
+            book.save(fh)
+            fh.seek(0)
+            for block in iter(lambda: fh.read(block_size), b""):
+                yield block
+
+    def export_response(self, object_list, format="csv", filename=None, **kwargs):
+        """
+        Returns a StreamingHttpResponse that exports object_list in one of export_formats()
+        """
+        if format not in dict(self.export_formats()):
+            raise ValueError("Unsupported export format %r" % format)
+        content_types = {
+            "csv": "text/csv",
+            "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        }
+        stream = getattr(self, "stream_%s" % format)(object_list, **kwargs)
+        response = StreamingHttpResponse(stream, content_type=content_types[format])
+        if filename:
+            response["Content-Disposition"] = 'attachment; filename="%s.%s"' % (filename, format)
+        return response
+
     @staticmethod
     def export_formats():
         return (
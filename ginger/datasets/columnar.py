@@ -0,0 +1,336 @@
+import array
+import collections
+import inspect
+
+from django.utils import six
+from django.utils.functional import cached_property
+
+from ginger import stats
+from ginger.dataset import BoundColumn, DataRow, GingerDataSet
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+__all__ = ['ColumnData', 'ColumnStore', 'ColumnarDataSet']
+
+
+TYPECODES = {
+    "int": "q",
+    "integer": "q",
+    "float": "d",
+    "number": "d",
+    "bool": "b",
+    "boolean": "b",
+}
+
+
+# exact types kept in typed columns; anything else (Decimal, numpy scalars, int subclasses)
+# would be silently converted by array.array
+ARRAY_TYPES = frozenset(six.integer_types + (float, bool))
+
+
+class ColumnData(object):
+    """
+    Values of a single column. Typed columns are backed by an array.array with
+    a parallel null mask; untyped ones (or typed ones that received a value that
+    does not fit) are plain lists.
+    """
+
+    __slots__ = ("typecode", "values", "nulls")
+
+    def __init__(self, typecode=None):
+        self.typecode = typecode
+        self.values = array.array(typecode) if typecode else []
+        self.nulls = bytearray() if typecode else None
+
+    def is_typed(self):
+        return self.typecode is not None
+
+    def _untype(self):
+        self.values = list(self)
+        self.typecode = None
+        self.nulls = None
+
+    def _coerce(self, value):
+        return bool(value) if self.typecode == "b" else value
+
+    def insert(self, i, value):
+        if self.typecode:
+            if value is None:
+                self.values.insert(i, 0)
+                self.nulls.insert(i, 1)
+                return
+            if type(value) in ARRAY_TYPES:
+                try:
+                    self.values.insert(i, value)
+                except (TypeError, OverflowError):
+                    pass
+                else:
+                    self.nulls.insert(i, 0)
+                    return
+            self._untype()
+        self.values.insert(i, value)
+
+    def append(self, value):
+        self.insert(len(self), value)
+
+    def permute(self, order):
+        values = self.values
+        if self.typecode:
+            nulls = self.nulls
+            self.values = array.array(self.typecode, (values[i] for i in order))
+            self.nulls = bytearray(nulls[i] for i in order)
+        else:
+            self.values = [values[i] for i in order]
+
+    def to_array(self):
+        """
+        Returns a numpy masked array with nulls masked out.
+        """
+        if numpy is None:
+            raise ImportError("numpy is required for vectorized column access")
+        if self.typecode:
+            # copies, so that the array.array is not locked against resizing
+            values = numpy.array(self.values, dtype=self.typecode)
+            if self.typecode == "b":
+                values = values.astype(bool)
+            mask = numpy.array(self.nulls, dtype=bool)
+            return numpy.ma.masked_array(values, mask=mask)
+        values = numpy.array(self.values, dtype=object)
+        mask = numpy.array([v is None for v in self.values], dtype=bool)
+        return numpy.ma.masked_array(values, mask=mask)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        if not self.typecode:
+            return iter(self.values)
+        coerce = self._coerce
+        return (None if null else coerce(v) for v, null in six.moves.zip(self.values, self.nulls))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in six.moves.range(*i.indices(len(self)))]
+        if self.typecode and self.nulls[i]:
+            return None
+        return self._coerce(self.values[i])
+
+    def __setitem__(self, i, value):
+        if self.typecode:
+            if value is None:
+                self.nulls[i] = 1
+                return
+            if type(value) in ARRAY_TYPES:
+                try:
+                    self.values[i] = value
+                except (TypeError, OverflowError):
+                    pass
+                else:
+                    self.nulls[i] = 0
+                    return
+            self._untype()
+        self.values[i] = value
+
+
+class ColumnStore(object):
+
+    def __init__(self, typecodes):
+        self.columns = [ColumnData(code) for code in typecodes]
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, i, values):
+        values = tuple(values)
+        if len(values) != len(self.columns):
+            raise ValueError("Expected %d values, got %d" % (len(self.columns), len(values)))
+        for column, value in six.moves.zip(self.columns, values):
+            column.insert(i, value)
+        self.size += 1
+
+    def append(self, values):
+        self.insert(self.size, values)
+
+    def get(self, i, position):
+        return self.columns[position][i]
+
+    def set(self, i, position, value):
+        self.columns[position][i] = value
+
+    def row(self, i):
+        return tuple(column[i] for column in self.columns)
+
+    def iter_rows(self, positions=None):
+        columns = self.columns
+        if positions is not None:
+            columns = [columns[p] for p in positions]
+        return six.moves.zip(*columns) if columns else iter(())
+
+    def permute(self, order):
+        for column in self.columns:
+            column.permute(order)
+
+
+class ColumnarBoundColumn(BoundColumn):
+
+    @property
+    def data(self):
+        return self.schema.store.columns[self.position]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, item):
+        return self.data[item]
+
+    def to_array(self):
+        return self.data.to_array()
+
+    def aggregate(self, names=stats.AGGREGATES):
+        data = self.data
+        values = data.to_array() if numpy is not None and data.is_typed() else data
+        return stats.aggregate(values, names)
+
+    def sort(self, key=None, reverse=False):
+        data = self.data
+        if key is None and numpy is not None and data.is_typed():
+            values = data.to_array()
+            order = numpy.lexsort((values.data, ~values.mask))
+            if reverse:
+                order = order[::-1]
+        else:
+            if key is None:
+                key = lambda a: ((0 if a is None else 1), a)
+            order = sorted(six.moves.range(len(data)), key=lambda i: key(data[i]), reverse=reverse)
+        self.schema.store.permute(order)
+
+
+class ColumnarDataRow(DataRow):
+    """
+    Transient view over a single record of a ColumnarDataSet. The source object
+    is not retained.
+    """
+
+    def __init__(self, owner, index, aggregate=False):
+        self.index = index
+        super(ColumnarDataRow, self).__init__(owner, None, aggregate)
+
+    @property
+    def data(self):
+        return self.owner().store.row(self.index)
+
+    def set_value(self, position, value):
+        self.owner().store.set(self.index, position, value)
+
+    def __getattr__(self, item):
+        col = self.columns[item]
+        return self.owner().store.get(self.index, col.position)
+
+    def __getitem__(self, item):
+        col = self.columns[item]
+        return self.owner().store.get(self.index, col.position)
+
+
+class ColumnarRowList(object):
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return len(self.dataset.store)
+
+    def __getitem__(self, item):
+        size = len(self)
+        if isinstance(item, slice):
+            return [self[i] for i in six.moves.range(*item.indices(size))]
+        if item < 0:
+            item += size
+        if not 0 <= item < size:
+            raise IndexError("row index out of range")
+        return self.dataset.datarow_class(self.dataset, item)
+
+    def __iter__(self):
+        row_class = self.dataset.datarow_class
+        for i in six.moves.range(len(self)):
+            yield row_class(self.dataset, i)
+
+    def append(self, data):
+        return self.dataset.append(data)
+
+    def insert(self, i, data):
+        return self.dataset.insert(i, data)
+
+    def sort(self, key=None, reverse=False):
+        if key is None:
+            key = lambda row: row.data
+        rows = list(self)
+        order = sorted(six.moves.range(len(rows)), key=lambda i: key(rows[i]), reverse=reverse)
+        self.dataset.store.permute(order)
+
+
+class ColumnarDataSet(GingerDataSet):
+    """
+    GingerDataSet that stores each column as a typed array instead of keeping one
+    DataRow per record. Columns whose kind is listed in column_typecodes are
+    stored as array.array values (8 bytes per cell plus a one byte null mask),
+    everything else as a list. Rows are created on access and only live as long
+    as they are referenced.
+    """
+
+    datarow_class = ColumnarDataRow
+
+    aggregaterow_class = DataRow
+
+    boundcolumn_class = ColumnarBoundColumn
+
+    column_typecodes = TYPECODES
+
+    def get_column_typecode(self, column):
+        return self.column_typecodes.get(column.kind)
+
+    @cached_property
+    def store(self):
+        return ColumnStore([self.get_column_typecode(col) for col in self.columns])
+
+    @property
+    def rows(self):
+        return ColumnarRowList(self)
+
+    def extend(self, items):
+        is_iterator = inspect.isgenerator(items) or isinstance(items, collections.Iterator)
+        self.object_list = None if is_iterator else items
+        source = self.iter_source(items)
+        if hasattr(source, "iterator"):
+            source = source.iterator()
+        for d in source:
+            self.append(d)
+
+    def append(self, data):
+        return self.insert(len(self.store), data)
+
+    def insert(self, i, data):
+        size = len(self.store)
+        if i < 0:
+            i = max(size + i, 0)
+        i = min(i, size)
+        row = self.datarow_class(self, i)
+        values = data.data if isinstance(data, DataRow) else row.prepare_data(data)
+        self.store.insert(i, values)
+        return row
+
+    def make_stream_row(self, obj):
+        return DataRow(self, obj)
+
+    def iter_export_rows(self, columns):
+        return six.moves.map(list, self.store.iter_rows([col.position for col in columns]))
+
+    def to_json(self):
+        return list(self.store.iter_rows())
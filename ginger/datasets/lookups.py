@@ -1,11 +1,34 @@
+import bisect
+import collections
+import heapq
+import itertools
 from django.core.exceptions import MultipleObjectsReturned
 from django.db.models import Q, ObjectDoesNotExist
+from django.utils import six
+from ginger.stats import divide
 import operator
 
 
 __all__ = ['ListQuerySet']
 
 
+def resolve(obj, attr):
+    return obj[attr] if isinstance(obj, collections.Mapping) else getattr(obj, attr)
+
+
+def make_getter(attr):
+    """
+    Getter for an a__b path that works on objects as well as on mappings
+    """
+    parts = attr.split("__")
+
+    def getter(obj):
+        for part in parts:
+            obj = resolve(obj, part)
+        return obj
+    return getter
+
+
 class And(object):
 
     def __init__(self, funcs):
@@ -35,6 +58,8 @@ class Not(And):
     def __nonzero__(self):
         return bool(self.func)
 
+    __bool__ = __nonzero__
+
     def test(self, *args, **kwargs):
         if self:
             return not bool(self.func(*args, **kwargs))
@@ -55,13 +80,24 @@ class Lookup(object):
         if func is None:
             func = self.getattr
             self.value = Lookup(op, value)
+            op = None
+        self.op = op
         self.func = func
 
     def check(self, first, second):
         return self.func(first, second)
 
+    def path_lookup(self):
+        """
+        :return: (path, op, value) of the innermost lookup, path being the full a__b attribute path
+        """
+        if self.op is not None:
+            return self.attr, self.op, self.value
+        path, op, value = self.value.path_lookup()
+        return "%s__%s" % (self.attr, path), op, value
+
     def __call__(self, arg):
-        first = getattr(arg, self.attr)
+        first = resolve(arg, self.attr)
         if callable(self.value):
             return self.value(first)
         else:
@@ -69,7 +105,7 @@ class Lookup(object):
         return self.check(first, second)
 
     def getattr(self, first, second):
-        return self.check_exact(getattr(first, self.attr), second)
+        return self.check_exact(resolve(first, self.attr), second)
 
     def check_startswith(self, first, second):
         return first.startswith(second)
@@ -89,6 +125,9 @@ class Lookup(object):
     def check_exact(self, obj, value):
         return obj == value
 
+    def check_in(self, first, second):
+        return first in second
+
     def check_gte(self, first, second):
         return first >= second
 
@@ -105,19 +144,327 @@ class Lookup(object):
         return (first is None) == second
 
 
+class HashIndex(object):
+    """
+    Positions of the objects of a collection grouped by the value of attr
+    """
+
+    lookups = {"exact", "in"}
+
+    def __init__(self, collection, attr):
+        self.attr = attr
+        buckets = self.buckets = {}
+        getter = make_getter(attr)
+        for i, obj in enumerate(collection):
+            buckets.setdefault(getter(obj), []).append(i)
+
+    def lookup(self, op, value):
+        try:
+            if op == "exact":
+                return self.buckets.get(value, [])
+            if op == "in":
+                return list(itertools.chain.from_iterable(self.buckets.get(v, ()) for v in set(value)))
+        except TypeError:
+            return None
+
+
+class SortedIndex(object):
+    """
+    Positions of the objects of a collection sorted by the value of attr. Objects whose
+    value is None are kept apart and never match a lookup.
+    """
+
+    lookups = {"exact", "in", "gt", "gte", "lt", "lte", "startswith"}
+
+    def __init__(self, collection, attr):
+        self.attr = attr
+        getter = make_getter(attr)
+        pairs = []
+        nulls = self.null_positions = []
+        for i, obj in enumerate(collection):
+            value = getter(obj)
+            if value is None:
+                nulls.append(i)
+            else:
+                pairs.append((value, i))
+        pairs.sort(key=operator.itemgetter(0))
+        self.keys = [p[0] for p in pairs]
+        self.positions = [p[1] for p in pairs]
+
+    def lookup(self, op, value):
+        keys = self.keys
+        positions = self.positions
+        try:
+            if op == "exact":
+                return positions[bisect.bisect_left(keys, value):bisect.bisect_right(keys, value)]
+            if op == "in":
+                return list(itertools.chain.from_iterable(self.lookup("exact", v) for v in set(value)))
+            if op == "gt":
+                return positions[bisect.bisect_right(keys, value):]
+            if op == "gte":
+                return positions[bisect.bisect_left(keys, value):]
+            if op == "lt":
+                return positions[:bisect.bisect_left(keys, value)]
+            if op == "lte":
+                return positions[:bisect.bisect_right(keys, value)]
+            if op == "startswith":
+                start = end = bisect.bisect_left(keys, value)
+                size = len(keys)
+                while end < size and keys[end].startswith(value):
+                    end += 1
+                return positions[start:end]
+        except (TypeError, AttributeError):
+            return None
+
+    def iter_positions(self, reverse=False):
+        """
+        Positions in the order a stable sort on attr would give, None values first
+        """
+        keys = self.keys
+        positions = self.positions
+        if not reverse:
+            for i in self.null_positions:
+                yield i
+            for i in positions:
+                yield i
+            return
+        end = len(keys)
+        while end > 0:
+            start = bisect.bisect_left(keys, keys[end - 1], 0, end)
+            for i in positions[start:end]:
+                yield i
+            end = start
+        for i in self.null_positions:
+            yield i
+
+
+def null_first(value):
+    """
+    Sort key that puts None before every other value, as SortedIndex.iter_positions does
+    """
+    return value is not None, value
+
+
+class Descending(object):
+    """
+    Inverts the ordering of a value so that mixed ascending and descending keys
+    can be sorted in a single pass
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class Accumulator(object):
+    """
+    Running state of a Sum, Count, Avg, Min or Max aggregate
+    """
+
+    functions = {"Sum", "Count", "Avg", "Min", "Max"}
+
+    def __init__(self, function, attr=None, distinct=False):
+        if function not in self.functions:
+            raise TypeError("Unsupported aggregate %r" % function)
+        self.function = function
+        self.getter = make_getter(attr) if attr is not None else None
+        self.seen = set() if distinct else None
+        self.count = 0
+        self.total = 0
+        self.value = None
+
+    @classmethod
+    def parse(cls, expression):
+        """
+        :param expression: django aggregate such as Sum("amount") or Count("*")
+        :return: (function, attr, distinct)
+        """
+        source = expression.get_source_expressions()[0]
+        distinct = getattr(expression, "distinct", None) or getattr(expression, "extra", {}).get("distinct")
+        return expression.name, getattr(source, "name", None), bool(distinct)
+
+    def add(self, obj):
+        if self.getter is None:
+            value = obj
+        else:
+            value = self.getter(obj)
+            if value is None:
+                return
+        if self.seen is not None:
+            if value in self.seen:
+                return
+            self.seen.add(value)
+        self.count += 1
+        function = self.function
+        if function in ("Sum", "Avg"):
+            self.total += value
+        elif function == "Min":
+            if self.value is None or value < self.value:
+                self.value = value
+        elif function == "Max":
+            if self.value is None or value > self.value:
+                self.value = value
+
+    def result(self):
+        function = self.function
+        if function == "Count":
+            return self.count
+        if not self.count:
+            return None
+        if function == "Sum":
+            return self.total
+        if function == "Avg":
+            return divide(self.total, self.count)
+        return self.value
+
+
+def parse_aggregates(args, kwargs):
+    result = collections.OrderedDict()
+    for expression in args:
+        result[expression.default_alias] = Accumulator.parse(expression)
+    for alias, expression in sorted(six.iteritems(kwargs)):
+        result[alias] = Accumulator.parse(expression)
+    return result
+
+
+def accumulate(objects, specs, group_by=None):
+    """
+    Feeds every object once to an accumulator per aggregate and per group
+    :return: OrderedDict of group key -> OrderedDict of alias -> value
+    """
+    groups = collections.OrderedDict()
+    key_func = (lambda obj: tuple(g(obj) for g in group_by)) if group_by else (lambda obj: ())
+    if not group_by:
+        groups[()] = [(alias, Accumulator(*spec)) for alias, spec in six.iteritems(specs)]
+    for obj in objects:
+        key = key_func(obj)
+        accumulators = groups.get(key)
+        if accumulators is None:
+            accumulators = groups[key] = [(alias, Accumulator(*spec)) for alias, spec in six.iteritems(specs)]
+        for _, accumulator in accumulators:
+            accumulator.add(obj)
+    return collections.OrderedDict(
+        (key, collections.OrderedDict((alias, acc.result()) for alias, acc in accumulators))
+        for key, accumulators in six.iteritems(groups)
+    )
+
+
 class ListQuerySet(object):
+    """
+    QuerySet-like wrapper around an in-memory collection. Hash and sorted indexes can be
+    built on chosen attributes with add_index(); they are shared by every queryset derived
+    from this one and assume the collection is not modified outside of update().
+    """
 
-    def __init__(self, collection):
+    def __init__(self, collection, indexes=None):
         self.collection = collection
         self.conditions = []
         self.ordering = ()
+        self.indexes = {} if indexes is None else indexes
+        self._fields = None
+        self._row_type = None
+        self._distinct = False
         self._cache = None
 
     def copy(self):
-        ins = self.__class__(self.collection)
+        ins = self.__class__(self.collection, indexes=self.indexes)
         ins.conditions.extend(self.conditions)
+        ins.ordering = self.ordering
+        ins._fields = self._fields
+        ins._row_type = self._row_type
+        ins._distinct = self._distinct
+        return ins
+
+    @property
+    def ordered(self):
+        return bool(self.ordering)
+
+    def none(self):
+        ins = self.copy()
+        ins.collection = ()
+        ins.indexes = {}
+        return ins
+
+    def values(self, *fields):
+        ins = self.copy()
+        ins._fields = fields
+        ins._row_type = dict
+        return ins
+
+    def values_list(self, *fields, **kwargs):
+        flat = kwargs.pop("flat", False)
+        if kwargs:
+            raise TypeError("Unexpected keyword arguments to values_list: %s" % list(kwargs))
+        if flat and len(fields) != 1:
+            raise TypeError("'flat' is only valid when values_list is called with one field")
+        ins = self.copy()
+        ins._fields = fields
+        ins._row_type = "flat" if flat else tuple
+        return ins
+
+    def distinct(self):
+        ins = self.copy()
+        ins._distinct = True
         return ins
 
+    def _project(self, objects):
+        row_type = self._row_type
+        if row_type is None:
+            return objects
+        fields = self._fields
+        if row_type == "flat":
+            getter = make_getter(fields[0])
+            return (getter(obj) for obj in objects)
+        if not fields:
+            if row_type is dict:
+                return (self._as_dict(obj) for obj in objects)
+            return (tuple(six.itervalues(self._as_dict(obj))) for obj in objects)
+        getters = [make_getter(f) for f in fields]
+        if row_type is dict:
+            return (dict((f, g(obj)) for f, g in six.moves.zip(fields, getters)) for obj in objects)
+        return (tuple(g(obj) for g in getters) for obj in objects)
+
+    @staticmethod
+    def _as_dict(obj):
+        if isinstance(obj, collections.Mapping):
+            return dict(obj)
+        return collections.OrderedDict((k, v) for k, v in sorted(six.iteritems(vars(obj))) if not k.startswith("_"))
+
+    def _unique(self, rows):
+        seen = set()
+        for row in rows:
+            key = tuple(sorted(six.iteritems(row))) if isinstance(row, dict) else row
+            if key not in seen:
+                seen.add(key)
+                yield row
+
+    def _output(self, objects):
+        rows = self._project(objects)
+        return self._unique(rows) if self._distinct else rows
+
+    def add_index(self, attr, sorted=False):
+        """
+        Builds an index on attr, sorted indexes also serve range, startswith and ordering.
+        Nested attributes are given as a__b.
+        """
+        if not isinstance(self.collection, (list, tuple)):
+            self.collection = list(self.collection)
+        index_class = SortedIndex if sorted else HashIndex
+        self.indexes.setdefault(attr, {})[index_class] = index_class(self.collection, attr)
+        return self
+
+    def _reindex(self, attrs):
+        for attr in attrs:
+            for index_class in list(self.indexes.get(attr, ())):
+                self.add_index(attr, sorted=index_class is SortedIndex)
+
     def order_by(self, *attrs):
         ins = self.copy()
         ins.ordering = attrs
@@ -135,8 +482,9 @@ class ListQuerySet(object):
 
     def filter(self, *args, **kwargs):
         ins = self.copy()
-        ins.conditions.append(And(map(self._resolve_q, args)))
-        ins.conditions.extend(Lookup(k, v) for k,v in kwargs.iteritems())
+        if args:
+            ins.conditions.append(And(map(self._resolve_q, args)))
+        ins.conditions.extend(Lookup(k, v) for k, v in six.iteritems(kwargs))
         return ins
 
     def exclude(self, *args, **kwargs):
@@ -144,34 +492,176 @@ class ListQuerySet(object):
         if args:
             ins.conditions.append(Not(And(map(self._resolve_q, args))))
         if kwargs:
-            ins.conditions.append(Not(And([Lookup(k, v) for k,v in kwargs.iteritems()])))
+            ins.conditions.append(Not(And([Lookup(k, v) for k, v in six.iteritems(kwargs)])))
         return ins
 
-    def _sort(self, values):
-        for o in reversed(self.ordering):
-            attr = o
-            reverse = False
-            if o.startswith("-"):
-                attr = o[1:]
-                reverse = True
-            values.sort(reverse=reverse, key=operator.attrgetter(attr))
-        return values
+    def _candidates(self):
+        """
+        Positions matching the most selective indexed top level lookup, None if there is no such lookup
+        """
+        best = None
+        for cond in self.conditions:
+            if not isinstance(cond, Lookup):
+                continue
+            path, op, value = cond.path_lookup()
+            for index in six.itervalues(self.indexes.get(path, {})):
+                if op not in index.lookups:
+                    continue
+                result = index.lookup(op, value)
+                if result is not None and (best is None or len(result) < len(best)):
+                    best = result
+        return best
+
+    def _iter_filtered(self, positions=None):
+        test = And(self.conditions)
+        collection = self.collection
+        if positions is None:
+            candidates = self._candidates()
+            if candidates is not None:
+                positions = sorted(candidates)
+        items = collection if positions is None else (collection[i] for i in positions)
+        return (obj for obj in items if test(obj)) if len(test) else iter(items)
+
+    def _sort_key(self):
+        attrs = [o.lstrip("-") for o in self.ordering]
+        flags = [o.startswith("-") for o in self.ordering]
+        getters = [make_getter(a) for a in attrs]
+        if len(set(flags)) == 1:
+            if len(getters) == 1:
+                getter = getters[0]
+                return (lambda obj: null_first(getter(obj))), flags[0]
+            return (lambda obj: tuple(null_first(g(obj)) for g in getters)), flags[0]
+
+        def key(obj):
+            return tuple(Descending(null_first(g(obj))) if desc else null_first(g(obj))
+                         for g, desc in zip(getters, flags))
+        return key, False
+
+    def _ordered_index(self):
+        """
+        Sorted index that yields objects in the requested order, if ordering is on a single indexed attr
+        """
+        if len(self.ordering) != 1:
+            return None
+        attr = self.ordering[0].lstrip("-")
+        return self.indexes.get(attr, {}).get(SortedIndex)
 
     def __len__(self):
-        return len(self.all())
+        return self.count()
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __bool__(self):
+        return self.exists()
+
+    __nonzero__ = __bool__
+
+    def __getitem__(self, item):
+        if self._cache is not None:
+            return self._cache[item]
+        if isinstance(item, slice):
+            start, stop, step = item.start or 0, item.stop, item.step
+            if start < 0 or (stop is not None and stop < 0):
+                return self.all()[item]
+            result = self._slice(start, stop)
+            return result[::step] if step else result
+        if item < 0:
+            return self.all()[item]
+        result = self._slice(item, item + 1)
+        if not result:
+            raise IndexError("ListQuerySet index out of range")
+        return result[0]
+
+    def _slice(self, start, stop):
+        """
+        Evaluates only as much of the collection as the slice needs
+        """
+        if not self.ordering:
+            return list(itertools.islice(self._output(self._iter_filtered()), start, stop))
+        index = self._ordered_index()
+        if index is not None:
+            positions = index.iter_positions(reverse=self.ordering[0].startswith("-"))
+            if self._candidates() is None:
+                return list(itertools.islice(self._output(self._iter_filtered(positions)), start, stop))
+        if stop is None or self._distinct:
+            return self.all()[start:stop]
+        key, reverse = self._sort_key()
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        return list(self._output(select(stop, self._iter_filtered(), key=key)[start:]))
+
+    def exists(self):
+        if self._cache is not None:
+            return bool(self._cache)
+        return next(self._iter_filtered(), None) is not None
 
     def count(self):
-        return len(self)
+        if self._cache is not None:
+            return len(self._cache)
+        if self._distinct:
+            return sum(1 for _ in self._output(self._iter_filtered()))
+        if not self.conditions:
+            return len(self.collection)
+        candidates = self._candidates()
+        if candidates is not None and len(self.conditions) == 1:
+            return len(candidates)
+        return sum(1 for _ in self._iter_filtered())
+
+    def _iter_objects(self):
+        """
+        Filtered objects in the requested order, before values() projection
+        """
+        index = self._ordered_index()
+        if index is not None and self._candidates() is None:
+            positions = index.iter_positions(reverse=self.ordering[0].startswith("-"))
+            return self._iter_filtered(positions)
+        if not self.ordering:
+            return self._iter_filtered()
+        key, reverse = self._sort_key()
+        return iter(sorted(self._iter_filtered(), key=key, reverse=reverse))
 
     def all(self):
         if self._cache is None:
-            self._cache = result = filter(And(self.conditions), self.collection)
-            if self.ordering:
-                self._sort(result)
+            self._cache = list(self._output(self._iter_objects()))
         return self._cache
 
+    def iterator(self, chunk_size=None):
+        """
+        Yields results without caching them, chunk_size is accepted for compatibility with QuerySet.iterator
+        """
+        if self._cache is not None:
+            return iter(self._cache)
+        return self._output(self._iter_objects())
+
+    def aggregate(self, *args, **kwargs):
+        """
+        Computes Sum, Count, Avg, Min and Max expressions in a single pass over the filtered collection
+        """
+        specs = parse_aggregates(args, kwargs)
+        return dict(accumulate(self._iter_filtered(), specs)[()])
+
+    def annotate(self, *args, **kwargs):
+        """
+        Groups by the fields given to values() or values_list() and aggregates each group in a single pass.
+        Returns a ListQuerySet of the resulting rows.
+        """
+        if not self._fields:
+            raise TypeError("annotate() requires values() or values_list() with group by fields")
+        specs = parse_aggregates(args, kwargs)
+        fields = self._fields
+        groups = accumulate(self._iter_objects(), specs, [make_getter(f) for f in fields])
+        rows = []
+        for key, values in six.iteritems(groups):
+            row = collections.OrderedDict(six.moves.zip(fields, key))
+            row.update(values)
+            rows.append(row)
+        result = self.__class__(rows)
+        if self._row_type is not dict:
+            result = result.values_list(*(list(fields) + list(specs)))
+        return result
+
     def get(self, *args, **kwargs):
-        result = self.filter(*args, **kwargs).all()
+        result = self.filter(*args, **kwargs)[:2]
         if not result:
             raise ObjectDoesNotExist
         if len(result) > 1:
@@ -180,10 +670,11 @@ class ListQuerySet(object):
 
     def update(self, **kwargs):
         result = []
-        for obj in self.all():
-            for k, v in kwargs.iteritems():
+        for obj in list(self._iter_filtered()):
+            for k, v in six.iteritems(kwargs):
                 setattr(obj, k, v)
             result.append(obj)
+        self._reindex(kwargs)
         return result
 
 
@@ -111,7 +111,8 @@ to apply filters:
 
     @classmethod
     def _reverse(self, viewname, args, kwargs, current_app=None, fail=True):
-        from django.core.urlresolvers import reverse, NoReverseMatch
+        from django.core.urlresolvers import NoReverseMatch
+        from ginger.urlcache import reverse
 
         # Try to look up the URL twice: once given the view name,
         # and again relative to what we guess is the "main" app.
@@ -1,19 +1,105 @@
 
 import inspect
 import copy
+import datetime
+import decimal
+import itertools
+import operator
+import tempfile
+import weakref
 from collections import OrderedDict
 
+from django.core.exceptions import FieldError
+from django.core.paginator import Page
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, Count, Max, Min, QuerySet, Sum, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils import six, timezone
+
+from ginger import stats
 from ginger.nav import Link
 from ginger.utils import get_url_with_modified_params
 
 __all__ = ['Formatter', 'FormattedTable', 'FormattedObject']
 
 
+_formatter_plans = weakref.WeakKeyDictionary()
+
+_prepare_methods = weakref.WeakKeyDictionary()
+
+_accessors = {}
+
+_missing = object()
+
+JSON_TYPES = six.string_types + six.integer_types + (float, bool)
+
+XLSX_TYPES = six.integer_types + (float, bool, decimal.Decimal, datetime.date, datetime.time)
+
+DB_AGGREGATES = {
+    "count": Count,
+    "sum": Sum,
+    "mean": Avg,
+    "min": Min,
+    "max": Max,
+}
+
+
+def compile_accessor(name):
+    """
+    Returns a cached function that resolves an a__b__c path on objects (with a single attrgetter)
+    and dicts, for any mix of the two.
+    """
+    try:
+        return _accessors[name]
+    except KeyError:
+        pass
+    parts = tuple(name.split("__"))
+    get_attr = operator.attrgetter(".".join(parts))
+    get_item = operator.itemgetter(parts[0]) if len(parts) == 1 else None
+
+    def walk(source):
+        result = source
+        for item in parts:
+            if isinstance(result, dict):
+                result = result[item]
+            else:
+                result = getattr(result, item)
+        return result
+
+    def accessor(source):
+        if isinstance(source, dict):
+            return get_item(source) if get_item is not None else walk(source)
+        try:
+            return get_attr(source)
+        except AttributeError:
+            # a dict somewhere down the path, or a genuinely missing attribute
+            return walk(source)
+
+    _accessors[name] = accessor
+    return accessor
+
+
+def get_prepare_method(owner_class, name):
+    """
+    Name of the prepare_<name> hook of owner_class, None if it has none. Resolved once per class.
+    """
+    methods = _prepare_methods.get(owner_class)
+    if methods is None:
+        methods = _prepare_methods[owner_class] = {}
+    try:
+        return methods[name]
+    except KeyError:
+        method = 'prepare_%s' % name
+        result = methods[name] = method if hasattr(owner_class, method) else None
+        return result
+
+
 class Formatter(object):
 
     __position = 1
 
-    def __init__(self, label=None, attr=None, hidden=False, sortable=True, variants=None, reverse=False, empty=""):
+    def __init__(self, label=None, attr=None, hidden=False, sortable=True, variants=None, reverse=False, empty="",
+                 aggregate=None):
         Formatter.__position += 1
         self.__position = Formatter.__position
         self.label = label
@@ -27,6 +113,14 @@ class Formatter(object):
                 variants = [variants]
             variants = set(variants)
         self.variants = variants
+        if aggregate is not None:
+            if not isinstance(aggregate, (list, tuple)):
+                aggregate = [aggregate]
+            unknown = set(aggregate).difference(stats.AGGREGATES)
+            if unknown:
+                raise ValueError("Unknown aggregates: %s" % ", ".join(sorted(unknown)))
+            aggregate = tuple(aggregate)
+        self.aggregate = aggregate
 
     def _update_position(self):
         Formatter.__position += 1
@@ -45,20 +139,12 @@ class Formatter(object):
         return str(value)
 
     def extract(self, name, source, owner=None):
-        if owner is not None:
-            method = 'prepare_%s' % name
-            func = getattr(owner, method, None)
-            if func:
-                return func(source)
-        parts = name.split("__")
-        result = source
-        while parts:
-            item = parts.pop(0)
-            if isinstance(result, dict):
-                result = result[item]
-            else:
-                result = getattr(result, item)
-        return result
+        if owner is not None and not isinstance(source, FooterRow):
+            # footer rows hold aggregates, not objects for the prepare_<name> hooks
+            method = get_prepare_method(owner.__class__, name)
+            if method is not None:
+                return getattr(owner, method)(source)
+        return compile_accessor(name)(source)
 
     def render(self, name, source, owner):
         value = self.extract(name, source, owner)
@@ -66,6 +152,23 @@ class Formatter(object):
 
     @classmethod
     def extract_from(cls, source, variant=None):
+        """
+        Returns (name, formatter) pairs of source ordered by position. For classes the result is
+        computed once per (class, variant) and shared, so it should not be modified.
+        """
+        if not isinstance(source, type):
+            return cls._collect(source, variant)
+        plans = _formatter_plans.get(source)
+        if plans is None:
+            plans = _formatter_plans[source] = {}
+        try:
+            return plans[variant]
+        except KeyError:
+            result = plans[variant] = tuple(cls._collect(source, variant))
+            return result
+
+    @staticmethod
+    def _collect(source, variant):
         result = sorted(inspect.getmembers(source, lambda a: isinstance(a, Formatter)),
             key=lambda p: p[1].position)
         result = [p for p in result if p[1].variants is None or variant in p[1].variants]
@@ -74,12 +177,17 @@ class Formatter(object):
 
 class FormattedValue(object):
 
+    __slots__ = ("name", "prop", "source", "_FormattedValue__attrs", "_FormattedValue__owner",
+                 "_FormattedValue__value", "_FormattedValue__text")
+
     def __init__(self, name, prop, source, attrs=None, owner=None):
         self.name = name
         self.prop = prop
         self.source = source
         self.__attrs = attrs
         self.__owner = owner
+        self.__value = _missing
+        self.__text = None
 
     def get_absolute_url(self):
         try:
@@ -100,45 +208,66 @@ class FormattedValue(object):
 
     @property
     def value(self):
-        try:
-            return self.prop.extract(self.name, self.source, self.__owner)
-        except AttributeError as ex:
-            raise ValueError("Error while accessing attribute %r in %r : %s" % (self.name, self.source, ex))
+        value = self.__value
+        if value is _missing:
+            try:
+                value = self.__value = self.prop.extract(self.name, self.source, self.__owner)
+            except AttributeError as ex:
+                raise ValueError("Error while accessing attribute %r in %r : %s" % (self.name, self.source, ex))
+        return value
 
     def __getattr__(self, item):
         return getattr(self.prop, item)
 
     def __str__(self):
-        value = self.value
-        if value is None:
-            return self.prop.empty
-        result = self.prop.format(value, self.name, self.source)
-        return str(result)
+        text = self.__text
+        if text is None:
+            value = self.value
+            if value is None:
+                return self.prop.empty
+            if isinstance(self.source, FooterRow) and value is self.source.label:
+                text = self.__text = str(value)
+            else:
+                text = self.__text = str(self.prop.format(value, self.name, self.source))
+        return text
 
 
 class FormattedObject(object):
 
     def __init__(self, obj, variant=None, **context):
+        self.__cells = {}
         self.context = context
         self.variant = variant
         self.__prop_cache = OrderedDict((n,p) for (n,p) in Formatter.extract_from(self.__class__, variant=variant) if not p.hidden)
         self.source = obj
-        data = self.data = OrderedDict()
-        for name, prop in self.__prop_cache.items():
-            data[name] = FormattedValue(name, prop, self.source, attrs=self.get_attrs, owner=self)
+
+    def _cell(self, name):
+        cells = self.__cells
+        try:
+            return cells[name]
+        except KeyError:
+            cell = cells[name] = FormattedValue(name, self.__prop_cache[name], self.source,
+                                                attrs=self.get_attrs, owner=self)
+            return cell
+
+    @property
+    def data(self):
+        return OrderedDict((name, self._cell(name)) for name in self.__prop_cache)
 
     def __getattr__(self, item):
+        if item.startswith("_FormattedObject__"):
+            raise AttributeError(item)
         return self.__getitem__(item)
 
     def __getitem__(self, item):
         try:
-            return self.data[item]
+            return self._cell(item)
         except KeyError:
             raise AttributeError(item)
 
     def __iter__(self):
-        for name, prop in self.__prop_cache.items():
-            yield self.data[name]
+        for name in self.__prop_cache:
+            yield self._cell(name)
 
     def __len__(self):
         return len(self.__prop_cache)
@@ -235,20 +364,35 @@ class FormattedTableColumnSet(object):
 
 
 class FormattedTableRow(object):
+    """
+    Row of a FormattedTable, its cells are created on first access.
+    """
+
+    __slots__ = ("index", "source", "table", "kind", "cells")
 
     def __init__(self, index, source, table, kind=None):
         self.index = index
         self.source = source
         self.table = table
         self.kind = kind
-        self.data = OrderedDict()
-        for column in self.table.columns:
-            self.data[column.name] = FormattedValue(column.name, column.prop, source,
-                                                    attrs=self.table.get_cell_attrs,
-                                                    owner=table)
+        self.cells = {}
+
+    def _cell(self, column):
+        cells = self.cells
+        try:
+            return cells[column.name]
+        except KeyError:
+            table = self.table
+            cell = cells[column.name] = FormattedValue(column.name, column.prop, self.source,
+                                                       attrs=table.get_cell_attrs, owner=table)
+            return cell
+
+    @property
+    def data(self):
+        return OrderedDict((column.name, self._cell(column)) for column in self.table.columns)
 
     def __getitem__(self, item):
-        return self.data[item]
+        return self._cell(self.table.columns[item])
 
     @property
     def object(self):
@@ -260,7 +404,7 @@ class FormattedTableRow(object):
 
     def __iter__(self):
         for column in self.table.columns:
-            yield self.data[column.name]
+            yield self._cell(column)
 
     def __len__(self):
         return len(self.table.columns)
@@ -298,6 +442,14 @@ class FooterRow:
 
 class FormattedTable(object):
 
+    aggregate_labels = {
+        "count": "Count",
+        "sum": "Total",
+        "mean": "Average",
+        "min": "Minimum",
+        "max": "Maximum"
+    }
+
     def __init__(self, source, sort_key=None, sort_field=None, variant=None, **context):
         self.context = context
         self.variant = variant
@@ -360,5 +512,224 @@ class FormattedTable(object):
     def get_cell_attrs(self, cell):
         return {}
 
+    def get_aggregate_source(self):
+        """
+        Aggregates cover the whole object_list of a paginated source, not only the current page
+        """
+        source = self.source
+        if isinstance(source, Page):
+            source = source.paginator.object_list
+        return source
+
+    def compute_aggregates(self):
+        """
+        Computes the aggregates declared on the formatters, in the database when the source is a QuerySet
+        and in a single pass over the source otherwise.
+        :return: OrderedDict of aggregate name -> {column name: value}
+        """
+        spec = [(col.name, col.prop, col.prop.aggregate) for col in self.columns if col.prop.aggregate]
+        if not spec:
+            return OrderedDict()
+        source = self.get_aggregate_source()
+        values = {}
+        if isinstance(source, QuerySet):
+            # columns with a prepare_<name> hook or that are not database fields are computed in python
+            db_spec = [item for item in spec if not get_prepare_method(self.__class__, item[0])]
+            try:
+                values = self.aggregate_queryset(source, db_spec) if db_spec else {}
+            except FieldError:
+                for item in db_spec:
+                    try:
+                        values.update(self.aggregate_queryset(source, [item]))
+                    except FieldError:
+                        pass
+        remaining = [item for item in spec if item[0] not in values]
+        if remaining:
+            values.update(self.aggregate_objects(source, remaining))
+        result = OrderedDict()
+        for key in stats.AGGREGATES:
+            row = dict((name, values[name][key]) for name, _, names in spec if key in names)
+            if row:
+                result[key] = row
+        return result
+
+    def aggregate_queryset(self, queryset, spec):
+        kwargs = {}
+        aliases = {}
+        for name, _, names in spec:
+            for key in names:
+                alias = "aggregate_%d" % len(kwargs)
+                kwargs[alias] = DB_AGGREGATES[key](name)
+                aliases[alias] = (name, key)
+        result = {}
+        for alias, value in six.iteritems(queryset.aggregate(**kwargs)):
+            name, key = aliases[alias]
+            if value is None and key in ("sum", "mean"):
+                value = 0
+            result.setdefault(name, {})[key] = value
+        return result
+
+    def aggregate_objects(self, objects, spec):
+        columns = [(name, prop, []) for name, prop, _ in spec]
+        for obj in objects:
+            for name, prop, values in columns:
+                values.append(prop.extract(name, obj, self))
+        return dict((name, stats.aggregate(values, names))
+                    for (name, _, values), (_, _, names) in six.moves.zip(columns, spec))
+
+    def get_export_source(self):
+        """
+        Exports cover the whole object_list of a paginated source, not only the current page
+        """
+        source = self.source
+        if isinstance(source, Page):
+            source = source.paginator.object_list
+        return source
+
+    def prepare_queryset(self, queryset):
+        return queryset
+
+    def iter_export_source(self, chunk_size):
+        """
+        Iterates over the export source, reading querysets with iterator() and prefetching
+        their related lookups one chunk at a time.
+        """
+        source = self.get_export_source()
+        if not isinstance(source, QuerySet):
+            for obj in source:
+                yield obj
+            return
+        source = self.prepare_queryset(source)
+        lookups = source._prefetch_related_lookups
+        try:
+            objects = source.iterator(chunk_size=chunk_size)
+        except TypeError:
+            objects = source.iterator()
+        while True:
+            chunk = list(itertools.islice(objects, chunk_size))
+            if not chunk:
+                return
+            if lookups:
+                prefetch_related_objects(chunk, *lookups)
+            for obj in chunk:
+                yield obj
+
+    def get_export_columns(self, hidden=False):
+        return tuple(col for col in self.columns if hidden or not col.hidden)
+
+    def iter_export_rows(self, columns, chunk_size=500):
+        for index, obj in enumerate(self.iter_export_source(chunk_size)):
+            row = FormattedTableRow(index, obj, self)
+            yield [row._cell(col) for col in columns]
+
+    def stream_csv(self, header=False, hidden=True, chunk_size=500):
+        """
+        Yields csv content, one chunk of chunk_size rows at a time
+        """
+        import csv
+        columns = self.get_export_columns(hidden)
+        buffer = six.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow([col.label for col in columns])
+        for i, cells in enumerate(self.iter_export_rows(columns, chunk_size), 1):
+            writer.writerow([str(cell) for cell in cells])
+            if i % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        content = buffer.getvalue()
+        if content:
+            yield content
+
+    def stream_ndjson(self, header=False, hidden=True, chunk_size=500):
+        """
+        Yields one json object per row, keyed by column name. Values that json can represent
+        are written as they are, others as their formatted text. header is ignored.
+        """
+        columns = self.get_export_columns(hidden)
+        names = [col.name for col in columns]
+        encoder = DjangoJSONEncoder(separators=(",", ":"))
+        lines = []
+        for cells in self.iter_export_rows(columns, chunk_size):
+            values = []
+            for cell in cells:
+                value = cell.value
+                if value is not None and not isinstance(value, JSON_TYPES):
+                    value = str(cell)
+                values.append(value)
+            lines.append(encoder.encode(OrderedDict(six.moves.zip(names, values))))
+            if len(lines) == chunk_size:
+                lines.append("")
+                yield "\n".join(lines)
+                del lines[:]
+        if lines:
+            lines.append("")
+            yield "\n".join(lines)
+
+    def stream_xlsx(self, header=False, hidden=True, chunk_size=500, block_size=64 * 1024):
+        """
+        Writes rows into a write-only workbook, which keeps them in a temporary file,
+        and yields the saved workbook in blocks of block_size bytes. Numbers and dates
+        are written as they are, others as their formatted text.
+        """
+        from openpyxl import Workbook
+        book = Workbook(write_only=True)
+        columns = self.get_export_columns(hidden)
+        sheet = book.create_sheet()
+        if header:
+            sheet.append([col.label for col in columns])
+        for cells in self.iter_export_rows(columns, chunk_size):
+            sheet.append([self.get_xlsx_value(cell) for cell in cells])
+        with tempfile.TemporaryFile() as fh:
+            book.save(fh)
+            fh.seek(0)
+            for block in iter(lambda: fh.read(block_size), b""):
+                yield block
+
+    @staticmethod
+    def get_xlsx_value(cell):
+        value = cell.value
+        if value is None or not isinstance(value, XLSX_TYPES):
+            return str(cell) if value is not None else None
+        if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+            # excel has no time zones
+            value = timezone.make_naive(value)
+        return value
+
+    def export_response(self, format="csv", filename=None, **kwargs):
+        """
+        Returns a StreamingHttpResponse that exports the table in one of export_formats()
+        """
+        content_types = dict(self.export_formats())
+        if format not in content_types:
+            raise ValueError("Unsupported export format %r" % format)
+        stream = getattr(self, "stream_%s" % format)(**kwargs)
+        response = StreamingHttpResponse(stream, content_type=content_types[format])
+        if filename:
+            response["Content-Disposition"] = 'attachment; filename="%s.%s"' % (filename, format)
+        return response
+
+    @staticmethod
+    def export_formats():
+        return (
+            ("csv", "text/csv"),
+            ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+            ("ndjson", "application/x-ndjson")
+        )
+
     def get_footer_rows(self):
-        return ()
\ No newline at end of file
+        """
+        One FooterRow per aggregate, labelled in the first visible column unless that column is aggregated
+        """
+        rows = []
+        visible = self.columns.visible_columns()
+        label_column = visible[0].name if visible else None
+        for key, values in six.iteritems(self.compute_aggregates()):
+            row = self.footer_row(self.aggregate_labels.get(key, key))
+            if label_column is not None and label_column not in values:
+                setattr(row, label_column, row.label)
+            for name, value in six.iteritems(values):
+                setattr(row, name, value)
+            rows.append(row)
+        return rows
\ No newline at end of file
@@ -1,7 +1,7 @@
 
 from django.utils.formats import localize
 from django.utils import timezone
-from .base import Formatter
+from .base import Formatter, compile_accessor
 
 
 __all__ = ['ChoiceFormatter', 'FileFormatter', 'ImageFormatter', 'CallableFormatter',
@@ -12,11 +12,9 @@ __all__ = ['ChoiceFormatter', 'FileFormatter', 'ImageFormatter', 'CallableFormat
 class ChoiceFormatter(Formatter):
 
     def format(self, value, name, source):
-        parts = name.split("__")
-        tail = parts.pop()
-        while parts:
-            item = parts.pop(0)
-            source = getattr(source, item)
+        head, _, tail = name.rpartition("__")
+        if head:
+            source = compile_accessor(head)(source)
         method = getattr(source, "get_%s_display" % tail, None)
         return method() if method is not None else None
 
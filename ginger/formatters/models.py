@@ -1,10 +1,13 @@
+import copy
+import weakref
 from collections import OrderedDict
 
 from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Page
 from django.utils import six
 from django.db import models
 from .formatters import *
-from .base import FormattedObject, FormattedTable
+from .base import FormattedObject, FormattedTable, get_prepare_method
 from django.conf import settings
 
 
@@ -59,6 +62,51 @@ def get_formatters_for_model(model_class, fields=None, exclude=None, options=Non
     return result
 
 
+_queryset_plans = weakref.WeakKeyDictionary()
+
+
+def get_queryset_plan(model, paths):
+    """
+    Works out how to load the given formatter paths for a queryset of model in a fixed number of queries.
+    Forward foreign keys and one to one fields are joined, other relations are prefetched.
+    :return: (select_related, prefetch_related, only) where only is None if a path does not end at a
+    model field, for instance a property, since it may need any field
+    """
+    select_related = set()
+    prefetch_related = set()
+    only = set()
+    for path in paths:
+        current = model
+        parts = path.split("__")
+        prefetched = False
+        for i, part in enumerate(parts):
+            opts = current._meta
+            try:
+                field = opts.pk if part == "pk" else opts.get_field(part)
+            except FieldDoesNotExist:
+                only = None
+                break
+            lookup = "__".join(parts[:i + 1])
+            if not field.is_relation or (part == getattr(field, "attname", None) and part != field.name):
+                # the attname of a foreign key (content_type_id) is a plain column
+                if only is not None and not prefetched:
+                    only.add(lookup)
+                break
+            if not prefetched and field.concrete and (field.many_to_one or field.one_to_one):
+                select_related.add(lookup)
+                if only is not None and i == len(parts) - 1:
+                    only.add(lookup)
+            else:
+                prefetch_related.add(lookup)
+                prefetched = True
+            current = field.related_model
+    for lookup in select_related:
+        # a joined relation that is displayed as a whole needs all of its fields
+        if only is not None and lookup in only:
+            only = set(o for o in only if not o.startswith("%s__" % lookup)) | {lookup}
+    return sorted(select_related), sorted(prefetch_related), sorted(only) if only is not None else None
+
+
 class MetaFormattedModel(type):
 
     def __init__(cls, name, bases, attrs):
@@ -86,7 +134,55 @@ class FormattedModel(FormattedObject):
 
 @six.add_metaclass(MetaFormattedModel)
 class FormattedModelTable(FormattedTable):
-    pass
+    """
+    Applies select_related and prefetch_related derived from its formatters to a QuerySet (or the
+    QuerySet of a Page) source, unless the source is already evaluated. With defer_unused_fields
+    only() is applied as well, so any other attribute read on a row costs a query.
+    """
+
+    auto_prefetch = True
+    defer_unused_fields = False
+
+    def __init__(self, source, *args, **kwargs):
+        super(FormattedModelTable, self).__init__(source, *args, **kwargs)
+        if self.auto_prefetch:
+            if isinstance(source, Page):
+                page = copy.copy(source)
+                page.object_list = self.prepare_queryset(source.object_list)
+                self.source = page
+            else:
+                self.source = self.prepare_queryset(source)
+
+    @classmethod
+    def get_queryset_plan(cls, model, variant=None):
+        plans = _queryset_plans.get(cls)
+        if plans is None:
+            plans = _queryset_plans[cls] = {}
+        key = (model, variant)
+        try:
+            return plans[key]
+        except KeyError:
+            pass
+        names = [name for name, _ in Formatter.extract_from(cls, variant=variant)]
+        select_related, prefetch_related, only = get_queryset_plan(model, names)
+        if any(get_prepare_method(cls, name) for name in names):
+            only = None
+        result = plans[key] = (select_related, prefetch_related, only)
+        return result
+
+    def prepare_queryset(self, queryset):
+        if not isinstance(queryset, models.QuerySet) or queryset._result_cache is not None or \
+                queryset._fields is not None:
+            return queryset
+        select_related, prefetch_related, only = self.get_queryset_plan(queryset.model, self.variant)
+        query = queryset.query
+        if only and self.defer_unused_fields and not query.deferred_loading[0] and not query.select_related:
+            queryset = queryset.only(*only)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
 
 
 def object_formatter_factory(model_class, fields=None, exclude=None, **kwargs):
@@ -1,6 +1,6 @@
 
 import datetime
-import inspect
+import weakref
 from django.core.exceptions import ImproperlyConfigured
 from django.http.request import QueryDict
 from django.utils import six
@@ -26,6 +26,44 @@ __all__ = ['GingerModelForm',
 
 
 
+_constructor_keywords = weakref.WeakKeyDictionary()
+
+
+def get_constructor_keywords(cls, parent_cls, mixin=None):
+    """
+    Returns the argument names of parent_cls.__init__ and, when mixin is given, of the constructor
+    that follows mixin in the mro of cls if that is a different function. Computed once per class.
+    :return: (keywords, mixin_keywords)
+    """
+    cache = _constructor_keywords.setdefault(cls, {})
+    try:
+        return cache[parent_cls, mixin]
+    except KeyError:
+        pass
+    constructor = parent_cls.__init__
+    keywords = frozenset(utils.get_argspec(constructor).args)
+    mixin_keywords = frozenset()
+    if mixin is not None:
+        func = lambda a: getattr(a, '__func__', a)
+        mixin_constructor = super(mixin, cls).__init__
+        if func(mixin_constructor) is not func(constructor):
+            mixin_keywords = frozenset(utils.get_argspec(mixin_constructor).args)
+    result = cache[parent_cls, mixin] = keywords, mixin_keywords
+    return result
+
+
+def get_execute_arguments(execute):
+    """
+    Names of the arguments execute accepts, or None if it takes **kwargs
+    """
+    spec = utils.get_argspec(execute)
+    if spec.varargs:
+        raise ImproperlyConfigured("Form.execute cannot have variable arguments")
+    if spec.keywords:
+        return None
+    return spec.args[1:]
+
+
 class GingerSafeEmptyTuple(tuple):
     def __len__(self):
         return 1
@@ -37,8 +75,7 @@ class GingerFormMixinBase(object):
 
     def __init__(self, **kwargs):
         parent_cls = forms.Form if not isinstance(self, forms.ModelForm) else forms.ModelForm
-        constructor = parent_cls.__init__
-        keywords = set(inspect.getargspec(constructor).args)
+        keywords = get_constructor_keywords(type(self), parent_cls)[0]
         context = {}
         for key in kwargs.copy():
             if key in keywords:
@@ -77,12 +114,10 @@ class GingerFormMixinBase(object):
                 instance = self.save(commit=False)
                 context["instance"] = instance
             context["data"] = self.cleaned_data
-        spec = inspect.getargspec(self.execute)
-        if spec.varargs:
-            raise ImproperlyConfigured("Form.execute cannot have variable arguments")
-        if spec.keywords:
+        arguments = get_execute_arguments(self.execute)
+        if arguments is None:
             return context
-        return {k: context[k] for k in spec.args[1:] if k in context}
+        return {k: context[k] for k in arguments if k in context}
 
 
     def full_clean(self):
@@ -123,12 +158,7 @@ class GingerFormMixin(object):
 
     def __init__(self, **kwargs):
         parent_cls = forms.Form if not isinstance(self, forms.ModelForm) else forms.ModelForm
-        constructor = parent_cls.__init__
-        parent_constructor = super(GingerFormMixin, self).__init__
-        keywords = set(inspect.getargspec(constructor).args)
-        func = lambda a: getattr(a, 'im_func', a)
-        parent_keywords = set(inspect.getargspec(parent_constructor).args) \
-            if func(parent_constructor) is not func(constructor) else set()
+        keywords, parent_keywords = get_constructor_keywords(type(self), parent_cls, GingerFormMixin)
         self.use_defaults = kwargs.pop("use_defaults", self.use_defaults)
         if "ignore_errors" in kwargs:
             self.ignore_errors = kwargs.pop("ignore_errors")
@@ -204,12 +234,10 @@ class GingerFormMixin(object):
                 instance = self.save(commit=False)
                 context["instance"] = instance
             context["data"] = self.cleaned_data
-        spec = inspect.getargspec(self.execute)
-        if spec.varargs:
-            raise ImproperlyConfigured("Form.execute cannot have variable arguments")
-        if spec.keywords:
+        arguments = get_execute_arguments(self.execute)
+        if arguments is None:
             return context
-        return {k: context[k] for k in spec.args[1:] if k in context}
+        return {k: context[k] for k in arguments if k in context}
 
     @property
     def initial_data(self):
@@ -334,7 +362,7 @@ class GingerSearchFormMixin(GingerFormMixin):
         return self.fields.keys()
 
     def process_queryset_filters(self, page=None, parameter_name="page",
-                      page_limit=10, per_page=20, **kwargs):
+                      page_limit=10, per_page=20, count_strategy=None, **kwargs):
         queryset = self.get_queryset(**kwargs)
         data = self.cleaned_data if self.is_bound else self.initial_data
         allowed = set(self.get_queryset_filter_names())
@@ -363,7 +391,8 @@ class GingerSearchFormMixin(GingerFormMixin):
         if page is not None:
             queryset = self.paginate(queryset, page,
                                  parameter_name=parameter_name,
-                                 page_limit=page_limit, per_page=per_page)
+                                 page_limit=page_limit, per_page=per_page,
+                                 count_strategy=count_strategy)
         return queryset
 
     @staticmethod
@@ -468,8 +497,7 @@ class GingerModelFormSet(forms.BaseModelFormSet):
 
     def __init__(self, **kwargs):
         parent_cls = forms.BaseFormSet if not isinstance(self, forms.BaseModelFormSet) else forms.BaseModelFormSet
-        constructor = parent_cls.__init__
-        keywords = set(inspect.getargspec(constructor).args)
+        keywords = get_constructor_keywords(type(self), parent_cls)[0]
         context = {}
         for key in kwargs.copy():
             if key in keywords:
@@ -508,12 +536,10 @@ class GingerModelFormSet(forms.BaseModelFormSet):
                 instance = self.save(commit=False)
                 context["instance"] = instance
             context["data"] = self.cleaned_data
-        spec = inspect.getargspec(self.execute)
-        if spec.varargs:
-            raise ImproperlyConfigured("Form.execute cannot have variable arguments")
-        if spec.keywords:
+        arguments = get_execute_arguments(self.execute)
+        if arguments is None:
             return context
-        return {k: context[k] for k in spec.args[1:] if k in context}
+        return {k: context[k] for k in arguments if k in context}
 
 
     def full_clean(self):
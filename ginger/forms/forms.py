@@ -1,12 +1,11 @@
 
-import inspect
 from collections import OrderedDict
 
-from django.core.exceptions import ImproperlyConfigured
 from django.utils import six
 from django import forms
 from django.utils.encoding import force_text
 from ginger.formatters import Formatter
+from ginger.forms.actions import get_constructor_keywords, get_execute_arguments
 from ginger.forms.fields import GingerSortField
 from ginger import utils
 
@@ -24,12 +23,7 @@ class ActionFormMixin(object):
     def __init__(self, **kwargs):
         self.optional_fields = kwargs.pop("optional_fields", set())
         parent_cls = forms.Form if not isinstance(self, forms.ModelForm) else forms.ModelForm
-        constructor = parent_cls.__init__
-        parent_constructor = super(ActionFormMixin, self).__init__
-        keywords = set(inspect.getargspec(constructor).args)
-        func = lambda a: getattr(a, 'im_func', a)
-        parent_keywords = set(inspect.getargspec(parent_constructor).args) \
-            if func(parent_constructor) is not func(constructor) else set()
+        keywords, parent_keywords = get_constructor_keywords(type(self), parent_cls, ActionFormMixin)
         context = {}
         for key in kwargs.copy():
             if key in keywords and key not in parent_keywords:
@@ -68,12 +62,10 @@ class ActionFormMixin(object):
 
         context["data"] = self.cleaned_data
 
-        spec = inspect.getargspec(func or self.get_action_method())
-        if spec.varargs:
-            raise ImproperlyConfigured("Form action cannot have variable arguments")
-        if spec.keywords:
+        arguments = get_execute_arguments(func or self.get_action_method())
+        if arguments is None:
             return context
-        return {k: context[k] for k in spec.args[1:] if k in context}
+        return {k: context[k] for k in arguments if k in context}
 
     def process_result(self, result):
         return result
@@ -175,7 +175,7 @@ def form_css_class(form):
 def render_page(request, page, previous="&laquo;", next="&raquo;", **kwargs):
     if isinstance(page, GingerDataSet):
         page = page.object_list
-    if page.paginator.num_pages <= 1:
+    if not page.has_other_pages():
         return ""
     H = common
     nav = H.ul(class_="pagination", **kwargs)
@@ -183,7 +183,7 @@ def render_page(request, page, previous="&laquo;", next="&raquo;", **kwargs):
         url = page.previous_link(request).url
         previous_tag = H.li(aria_label="Previous")[H.a(href=url)[previous]]
         nav.append(previous_tag)
-    for link in page.build_links(request):
+    for link in (page.build_links(request) if getattr(page, "numbered", True) else ()):
         if link.is_active:
             el = H.li(class_="active")[H.span[link.content]]
         else:
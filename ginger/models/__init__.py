@@ -1,2 +1,3 @@
 
 from .tracker import track_fields
+from .wizard import AbstractWizardStep
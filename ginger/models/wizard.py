@@ -0,0 +1,20 @@
+from django.db import models
+
+
+__all__ = ['AbstractWizardStep']
+
+
+class AbstractWizardStep(models.Model):
+    """
+    Form data of one wizard step, stored by ginger.views.storages.ModelFormStorage. Subclass it in
+    one of your apps to create the table.
+    """
+
+    run_id = models.CharField(max_length=32, db_index=True)
+    step_name = models.CharField(max_length=100)
+    data = models.TextField()
+    expires = models.DateTimeField(db_index=True)
+
+    class Meta:
+        abstract = True
+        unique_together = ("run_id", "step_name")
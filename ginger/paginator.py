@@ -1,16 +1,135 @@
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Q
 from django.http.request import HttpRequest
 from django.utils import six
-from django.core.paginator import Page, Paginator, EmptyPage, PageNotAnInteger
+from django.utils.encoding import force_bytes, force_text
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+from django.core.paginator import Page, Paginator, EmptyPage, InvalidPage, PageNotAnInteger
 
 from ginger import utils
 from ginger import ui
+from ginger.datasets.lookups import make_getter
+
+
+__all__ = ["GingerPaginator", "GingerPage", "KeysetPage", "InvalidCursor", "paginate",
+           "ExactCount", "CachedCount", "EstimatedCount"]
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class ExactCount(object):
+    """
+    Count strategies return (count, is_exact) for the object_list of a paginator
+    """
+
+    def count(self, paginator):
+        return Paginator.count.func(paginator), True
+
+
+class CachedCount(ExactCount):
+    """
+    Caches the COUNT(*) of a queryset for timeout seconds, keyed by its SQL without ordering.
+    Counts served from the cache are reported as not exact since they may be stale.
+    """
+
+    timeout = 300
+    cache_alias = "default"
+    key_prefix = "ginger.paginator.count"
+
+    def __init__(self, timeout=None, cache_alias=None):
+        if timeout is not None:
+            self.timeout = timeout
+        if cache_alias is not None:
+            self.cache_alias = cache_alias
+
+    def get_cache_key(self, queryset):
+        sql, params = queryset.order_by().query.sql_with_params()
+        digest = hashlib.md5(force_bytes("%s%r" % (sql, params))).hexdigest()
+        return "%s:%s:%s" % (self.key_prefix, queryset.db, digest)
+
+    def count(self, paginator):
+        object_list = paginator.object_list
+        if not hasattr(object_list, "query"):
+            return super(CachedCount, self).count(paginator)
+        try:
+            key = self.get_cache_key(object_list)
+        except EmptyResultSet:
+            return 0, True
+        cache = caches[self.cache_alias]
+        value = cache.get(key)
+        if value is not None:
+            return value, False
+        value, exact = super(CachedCount, self).count(paginator)
+        cache.set(key, value, self.timeout)
+        return value, exact
 
 
-__all__ = ["GingerPaginator", "GingerPage", "paginate"]
+class EstimatedCount(ExactCount):
+    """
+    Uses the PostgreSQL planner estimate when it is at least threshold rows: pg_class.reltuples
+    for unfiltered tables, the EXPLAIN row estimate otherwise. Smaller results, other databases
+    and in-memory object lists are counted exactly.
+    """
+
+    threshold = 100000
+
+    def __init__(self, threshold=None):
+        if threshold is not None:
+            self.threshold = threshold
+
+    def estimate(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        query = queryset.query
+        with connection.cursor() as cursor:
+            if not (query.where or query.distinct or query.group_by or query.combinator or
+                    query.low_mark or query.high_mark is not None):
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                               [connection.ops.quote_name(queryset.model._meta.db_table)])
+                row = cursor.fetchone()
+                return row[0] if row and row[0] > 0 else None
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute("EXPLAIN (FORMAT JSON) %s" % sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, six.string_types):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def count(self, paginator):
+        object_list = paginator.object_list
+        if hasattr(object_list, "query"):
+            try:
+                estimate = self.estimate(object_list)
+            except EmptyResultSet:
+                return 0, True
+            if estimate is not None and estimate >= self.threshold:
+                return estimate, False
+        return super(EstimatedCount, self).count(paginator)
+
+
+COUNT_STRATEGIES = {
+    "exact": ExactCount,
+    "cached": CachedCount,
+    "estimated": EstimatedCount,
+}
 
 
 class GingerPage(Page):
 
+    numbered = True
+
     def create_link(self, request, number):
         param = self.paginator.parameter_name
         url = utils.get_url_with_modified_params(request, {param: number})
@@ -31,18 +150,103 @@ class GingerPage(Page):
         return self.create_link(request, number)
 
 
+class KeysetPage(GingerPage):
+    """
+    Page of a keyset paginated object_list. It has no number and knows nothing about
+    the total, only the opaque cursors of its neighbours.
+    """
+
+    numbered = False
+    previous_label = "Previous"
+    next_label = "Next"
+
+    def __init__(self, object_list, paginator, cursor=None, next_cursor=None, previous_cursor=None):
+        super(KeysetPage, self).__init__(object_list, None, paginator)
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Page %s>' % (self.cursor or "first")
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def next_page_number(self):
+        return self.next_cursor
+
+    def previous_page_number(self):
+        return self.previous_cursor
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+    def create_link(self, request, cursor, content=None):
+        param = self.paginator.parameter_name
+        url = utils.get_url_with_modified_params(request, {param: cursor})
+        return ui.Link(url=url, content=content or six.text_type(cursor), is_active=cursor == self.cursor)
+
+    def build_links(self, request):
+        if self.has_previous():
+            yield self.previous_link(request)
+        if self.has_next():
+            yield self.next_link(request)
+
+    def previous_link(self, request):
+        return self.create_link(request, self.previous_cursor, self.previous_label)
+
+    def next_link(self, request):
+        return self.create_link(request, self.next_cursor, self.next_label)
+
+
 class GingerPaginator(Paginator):
+    """
+    Offset paginator by default. With keyset=True pages are fetched by seeking past the
+    ordering values of the last row seen (WHERE (a, pk) > (x, y) ORDER BY a, pk LIMIT n),
+    which costs the same on every page and never counts the whole object_list.
+    Keyset pagination follows the ordering of the object_list, which gets keyset_tiebreaker
+    appended if it is not already part of it; ordering fields should not be nullable.
+    """
 
     parameter_name = "page"
     page_limit = 10
     allow_empty = False
+    keyset = False
+    keyset_tiebreaker = "pk"
+    count_strategy = None
+    count_is_exact = True
 
     def __init__(self, object_list, per_page, **kwargs):
         self.parameter_name = kwargs.pop("parameter_name", self.parameter_name)
         self.allow_empty = kwargs.pop("allow_empty", self.allow_empty)
         self.page_limit = kwargs.pop("page_limit", self.page_limit)
+        self.keyset = kwargs.pop("keyset", self.keyset)
+        self.count_strategy = kwargs.pop("count_strategy", self.count_strategy)
         super(GingerPaginator, self).__init__(object_list, per_page, **kwargs)
 
+    def get_count_strategy(self):
+        """
+        count_strategy is a strategy instance or class, one of exact, cached and estimated or a
+        dotted path. Defaults to the GINGER_PAGINATOR_COUNT setting.
+        """
+        strategy = self.count_strategy or getattr(settings, "GINGER_PAGINATOR_COUNT", "exact")
+        if isinstance(strategy, six.string_types):
+            strategy = COUNT_STRATEGIES[strategy] if strategy in COUNT_STRATEGIES else import_string(strategy)
+        if isinstance(strategy, type):
+            strategy = strategy()
+        return strategy
+
+    @cached_property
+    def count(self):
+        value, self.count_is_exact = self.get_count_strategy().count(self)
+        return value
+
     def validate_number(self, number):
         """
         Validates the given 1-based page number.
@@ -53,7 +257,7 @@ class GingerPaginator(Paginator):
             raise PageNotAnInteger('That page number is not an integer')
         if number < 1:
             raise EmptyPage('That page number is less than 1')
-        if number > self.num_pages:
+        if number > self.num_pages and self.count_is_exact:
             if self.allow_empty or (number == 1 and self.allow_empty_first_page):
                 pass
             else:
@@ -65,16 +269,18 @@ class GingerPaginator(Paginator):
         Returns a Page object for the given 1-based page number.
         """
         if isinstance(value, HttpRequest):
-            value = value.GET.get(self.parameter_name, 1)
+            value = value.GET.get(self.parameter_name, None if self.keyset else 1)
         elif isinstance(value, dict):
-            value = value.get(self.parameter_name, 1)
+            value = value.get(self.parameter_name, None if self.keyset else 1)
+        if self.keyset:
+            return self.keyset_page(value)
         number = self.validate_number(value)
-        if number > self.num_pages:
+        if number > self.num_pages and self.count_is_exact:
             result = self.object_list.none() if hasattr(self.object_list, "none") else []
         else:
             bottom = (number - 1) * self.per_page
             top = bottom + self.per_page
-            if top + self.orphans >= self.count:
+            if top + self.orphans >= self.count and self.count_is_exact:
                 top = self.count
             result = self.object_list[bottom:top]
         return self._get_page(result, number, self)
@@ -82,6 +288,99 @@ class GingerPaginator(Paginator):
     def _get_page(self, *args, **kwargs):
         return GingerPage(*args, **kwargs)
 
+    def get_keyset_ordering(self):
+        object_list = self.object_list
+        query = getattr(object_list, "query", None)
+        if query is not None:
+            ordering = list(query.order_by or (query.default_ordering and object_list.model._meta.ordering) or ())
+            pk_names = {"pk", object_list.model._meta.pk.name}
+        else:
+            ordering = list(getattr(object_list, "ordering", ()))
+            pk_names = {"pk"}
+        for field in ordering:
+            if not isinstance(field, six.string_types) or field == "?":
+                raise ValueError("Keyset pagination needs field name ordering, got %r" % (field,))
+        tiebreaker = self.keyset_tiebreaker
+        if tiebreaker:
+            pk_names.add(tiebreaker)
+            if not any(field.lstrip("-") in pk_names for field in ordering):
+                descending = ordering and ordering[-1].startswith("-")
+                ordering.append("-%s" % tiebreaker if descending else tiebreaker)
+        if not ordering:
+            raise ValueError("Keyset pagination needs an ordered object_list")
+        return ordering
+
+    def encode_cursor(self, values, reverse=False):
+        payload = json.dumps([int(reverse), values], cls=DjangoJSONEncoder, separators=(",", ":"))
+        return force_text(base64.urlsafe_b64encode(force_bytes(payload))).rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            cursor = force_bytes(cursor)
+            payload = base64.urlsafe_b64decode(cursor + b"=" * (-len(cursor) % 4))
+            reverse, values = json.loads(force_text(payload))
+        except (TypeError, ValueError):
+            raise InvalidCursor("That cursor is not valid")
+        if not isinstance(values, list):
+            raise InvalidCursor("That cursor is not valid")
+        return bool(reverse), values
+
+    def get_keyset_values(self, obj, ordering):
+        return [make_getter(field.lstrip("-"))(obj) for field in ordering]
+
+    def get_keyset_filter(self, ordering, values, reverse=False):
+        """
+        Q for rows after values in ordering, (or before them if reverse)
+        """
+        result = None
+        for i, field in enumerate(ordering):
+            op = "gt" if field.startswith("-") == reverse else "lt"
+            cond = Q(**{"%s__%s" % (field.lstrip("-"), op): values[i]})
+            for prev, value in six.moves.zip(ordering[:i], values):
+                cond &= Q(**{prev.lstrip("-"): value})
+            result = cond if result is None else result | cond
+        return result
+
+    def keyset_page(self, cursor):
+        """
+        Returns a KeysetPage for the given opaque cursor, the first page if cursor is empty.
+        Fetches one row more than per_page to find out if there is a page beyond.
+        """
+        ordering = self.get_keyset_ordering()
+        queryset = self.object_list
+        reverse, values = False, None
+        if cursor:
+            reverse, values = self.decode_cursor(cursor)
+            if len(values) != len(ordering):
+                raise InvalidCursor("That cursor does not match the ordering")
+            queryset = queryset.filter(self.get_keyset_filter(ordering, values, reverse))
+        if reverse:
+            queryset = queryset.order_by(*[f[1:] if f.startswith("-") else "-%s" % f for f in ordering])
+        else:
+            queryset = queryset.order_by(*ordering)
+        items = list(queryset[:self.per_page + 1])
+        more = len(items) > self.per_page
+        del items[self.per_page:]
+        if reverse:
+            items.reverse()
+        if not items and cursor and not self.allow_empty:
+            raise EmptyPage('That page contains no results')
+        has_next = True if reverse else more
+        has_previous = more if reverse else bool(cursor)
+        next_cursor = previous_cursor = None
+        if items:
+            if has_next:
+                next_cursor = self.encode_cursor(self.get_keyset_values(items[-1], ordering))
+            if has_previous:
+                previous_cursor = self.encode_cursor(self.get_keyset_values(items[0], ordering), True)
+        elif cursor:
+            if reverse:
+                next_cursor = self.encode_cursor(values)
+            else:
+                previous_cursor = self.encode_cursor(values, True)
+        return KeysetPage(items, self, cursor=cursor or None,
+                          next_cursor=next_cursor, previous_cursor=previous_cursor)
+
 
 def paginate(object_list, page, **kwargs):
     return GingerPaginator(object_list, **kwargs).page(page)
\ No newline at end of file
@@ -60,52 +60,94 @@ class Choice:
          return "|".join(p.strip() for p in parts)
 
 
+class Segment(object):
+    """
+    One path component of a Pattern. literal is the text of untyped components and None for typed
+    ones, whose regex is the capturing group without its trailing slash. kind is the pattern type
+    class of typed components, or None if their pattern is a raw regex.
+    """
+
+    __slots__ = ("regex", "literal", "optional", "kind")
+
+    def __init__(self, regex, literal=None, optional=False, kind=None):
+        self.regex = regex
+        self.literal = literal
+        self.optional = optional
+        self.kind = kind
+
+
 class Pattern(object):
 
     pattern_types = [Num, Slug, Name, Choice, Any, AlNum]
 
     _regex = re.compile("^(\w*)(\?)?:(.+?)(?:\s*\{\s*(\d*)\s*(,\s*\d*)?\s*\})?$")
 
+    _cache = {}
+
     def __init__(self, value, prefix=None):
         self.value = value if not isinstance(value, self.__class__) else value.value
         self.prefix = prefix
 
-    def match(self, value):
+    def match_type(self, value):
         for cls in self.pattern_types:
             p = cls()
             if p.match(value):
-                return p.pattern(value)
-        return value
+                return p
+        return None
+
+    def match(self, value):
+        p = self.match_type(value)
+        return p.pattern(value) if p is not None else value
 
     def __str__(self):
         return self.create()
 
-    def create(self):
+    def segments(self):
+        """
+        Returns the list of Segments, one per "/" separated component of the pattern.
+        """
+        key = (self.__class__, self.value, self.prefix)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
         parts = re.sub("/+", "/", self.value).lstrip("/").split("/")
         if self.prefix:
             parts.insert(0, self.prefix)
         result = []
-        size = len(parts)
-        for i, p in enumerate(parts):
-            slash = "" if i == size-1 else "/"
+        for p in parts:
             groups = self._regex.findall(p)
             if not groups:
-                if p:
-                    p = "%s%s" % (p, slash)
-                result.append(p)
+                result.append(Segment(p, literal=p))
             else:
                 name, opt, pattern, low, high = groups[0]
-                pattern = self.match(pattern)
+                kind = self.match_type(pattern)
+                pattern = kind.pattern(pattern) if kind is not None else pattern
                 if not low and not high:
                     limits = ""
                 else:
                     limits = "{%s%s}" % (low, high)
                     limits = re.sub("\s+", "", limits)
                 if name:
-                    pattern = r"(?P<%s>%s)%s%s" % (name, pattern, limits, slash)
+                    pattern = r"(?P<%s>%s)%s" % (name, pattern, limits)
                 else:
-                    pattern = r"(%s)%s%s" % (pattern, limits, slash)
-                if opt:
+                    pattern = r"(%s)%s" % (pattern, limits)
+                result.append(Segment(pattern, optional=bool(opt),
+                                      kind=kind.__class__ if kind is not None else None))
+        self._cache[key] = result
+        return result
+
+    def create(self):
+        segments = self.segments()
+        result = []
+        size = len(segments)
+        for i, segment in enumerate(segments):
+            slash = "" if i == size-1 else "/"
+            if segment.literal is not None:
+                result.append("%s%s" % (segment.literal, slash) if segment.literal else "")
+            else:
+                pattern = "%s%s" % (segment.regex, slash)
+                if segment.optional:
                     pattern = r"(?:%s)?" % pattern
                 result.append(pattern)
         return r"^%s$" % "".join(result)
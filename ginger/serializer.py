@@ -1,9 +1,19 @@
-
+import codecs
+import collections
+import inspect
+import itertools
+import json as stdlib_json
+import operator
+import re
 import traceback
+import weakref
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
 from django.core.paginator import Page
+from django.db.models import prefetch_related_objects
 from django.db.models.query import QuerySet
 from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import six
 from ginger.exceptions import NotFound, GingerHttpError, PermissionDenied, Http404
 
 try:
@@ -11,13 +21,47 @@ try:
 except ImportError:
     import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
 
 __all__ = ['encode', 'decode', 'JSONTemplate',
            "process_exception",
             "process_page",
-            "process_redirect"]
+            "process_redirect",
+           "get_backend",
+           "iter_encode",
+           "Serializer", "Field", "Nested"]
+
+
+_django_encoder = DjangoJSONEncoder()
 
 
+def serialize_object(o, serializers):
+    """
+    Converts an object that json cannot represent natively into one that it can
+    """
+    cls = o.__class__
+    if cls in serializers:
+        return serializers[cls](o)
+    if hasattr(o, 'to_json'):
+        return o.to_json()
+    elif isinstance(o, Page):
+        return process_page(o)
+    elif isinstance(o, QuerySet):
+        serializer_class = get_model_serializer(o, serializers)
+        if serializer_class is not None:
+            return serializer_class.serialize(o)
+        return list(o.all())
+    return _django_encoder.default(o)
+
 
 class GingerJSONEncoder(DjangoJSONEncoder):
 
@@ -26,17 +70,360 @@ class GingerJSONEncoder(DjangoJSONEncoder):
         super(GingerJSONEncoder, self).__init__(**kwargs)
 
     def default(self, o):
-        cls = o.__class__
-        serializers = self.serializers
-        if cls in serializers:
-            return serializers[cls](o)
-        if hasattr(o, 'to_json'):
-            return o.to_json()
-        elif isinstance(o, Page):
-            return process_page(o)
-        elif isinstance(o, QuerySet):
-            return list(o.all())
-        return super(GingerJSONEncoder, self).default(o)
+        return serialize_object(o, self.serializers)
+
+
+class JSONBackend(object):
+    """
+    Standard library encoder, supports all json.JSONEncoder options.
+    """
+
+    def encode(self, payload, serializers=None, **kwargs):
+        return GingerJSONEncoder(serializers=serializers or {}, **kwargs).encode(payload)
+
+    def decode(self, payload):
+        return json.loads(payload)
+
+
+class OrjsonBackend(JSONBackend):
+    """
+    orjson encodes the native types in C and calls serialize_object only for the others. Dates and
+    times are passed through to it as well so that their format stays that of DjangoJSONEncoder.
+    Calls with json.JSONEncoder options, and values orjson rejects itself (such as integers beyond
+    64 bits), are encoded by the standard library. Errors raised by serialize_object are not retried.
+    """
+
+    def __init__(self):
+        self.options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def encode(self, payload, serializers=None, **kwargs):
+        if kwargs:
+            return super(OrjsonBackend, self).encode(payload, serializers, **kwargs)
+        serializers = serializers or {}
+        failed = []
+
+        def default(o):
+            try:
+                return serialize_object(o, serializers)
+            except TypeError:
+                failed.append(o)
+                raise
+        try:
+            return orjson.dumps(payload, default=default, option=self.options).decode("utf-8")
+        except orjson.JSONEncodeError:
+            if failed:
+                raise
+            return super(OrjsonBackend, self).encode(payload, serializers)
+
+    def decode(self, payload):
+        return orjson.loads(payload)
+
+
+class UjsonBackend(JSONBackend):
+    """
+    ujson calls serialize_object for the types it does not know. Note that ujson writes
+    Decimal values as numbers and not as strings like the other backends.
+    """
+
+    def encode(self, payload, serializers=None, **kwargs):
+        if kwargs:
+            return super(UjsonBackend, self).encode(payload, serializers, **kwargs)
+        serializers = serializers or {}
+        return ujson.dumps(payload, default=lambda o: serialize_object(o, serializers),
+                           ensure_ascii=False)
+
+    def decode(self, payload):
+        return ujson.loads(payload)
+
+
+JSON_BACKENDS = {
+    "json": JSONBackend,
+    "orjson": OrjsonBackend,
+    "ujson": UjsonBackend,
+}
+
+_backends = {}
+
+
+def get_backend():
+    """
+    Returns the encoder backend named by the GINGER_JSON_BACKEND setting: json (the default),
+    orjson, ujson or auto which picks orjson if it is installed and the standard library otherwise.
+    """
+    name = getattr(settings, "GINGER_JSON_BACKEND", "json")
+    try:
+        return _backends[name]
+    except KeyError:
+        pass
+    key = name
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    elif name not in JSON_BACKENDS:
+        raise ValueError("Unknown json backend %r" % name)
+    elif {"orjson": orjson, "ujson": ujson}.get(name, json) is None:
+        raise ImportError("%s is required for the %s json backend" % (name, name))
+    backend = _backends[key] = JSON_BACKENDS[name]()
+    return backend
+
+
+def iter_queryset(queryset, chunk_size):
+    try:
+        return queryset.iterator(chunk_size=chunk_size)
+    except TypeError:
+        return queryset.iterator()
+
+
+def get_model_serializer(queryset, serializers):
+    """
+    Serializer class registered for the model of a QuerySet of instances in the serializers map, if any
+    """
+    result = serializers.get(queryset.model)
+    if queryset._fields is None and isinstance(result, type) and issubclass(result, Serializer):
+        return result
+    return None
+
+
+class Field(object):
+
+    __position = 1
+
+    def __init__(self, attr=None):
+        Field.__position += 1
+        self.__position = Field.__position
+        self.attr = attr
+
+    @property
+    def position(self):
+        return self.__position
+
+
+class Nested(Field):
+    """
+    Serializes a related object with serializer_class, or all of them for many=True
+    """
+
+    def __init__(self, serializer_class, attr=None, many=False):
+        super(Nested, self).__init__(attr=attr)
+        self.serializer_class = serializer_class
+        self.many = many
+
+
+_serializer_fields = weakref.WeakKeyDictionary()
+
+_serializer_functions = weakref.WeakKeyDictionary()
+
+_serializer_plans = weakref.WeakKeyDictionary()
+
+
+def _walk(obj, parts):
+    for part in parts:
+        if obj is None:
+            return None
+        obj = getattr(obj, part)
+    return obj
+
+
+def _related_model(model, path):
+    """
+    Returns the model a path of relations ends at, or None if any part of it is not a relation
+    (a property, a method or the attname of a foreign key)
+    """
+    for part in path.split("__"):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if not field.is_relation or field.name != part or field.related_model is None:
+            return None
+        model = field.related_model
+    return model
+
+
+class Serializer(object):
+    """
+    Declarative serialization of objects into dicts:
+
+        class PermissionSerializer(Serializer):
+            name = Field()
+            app = Field(attr="content_type__app_label")
+            content_type = Nested(ContentTypeSerializer)
+
+    Each class is compiled once into a function of the object. QuerySets are read with a single
+    values_list() when every field is a model field or a nested foreign key, and with
+    select_related()/prefetch_related() otherwise. A Serializer class can also be given in the
+    serializers map of encode() for its model.
+    """
+
+    def __init__(self, source):
+        self.source = source
+
+    def to_json(self):
+        return self.serialize(self.source)
+
+    @classmethod
+    def get_fields(cls):
+        try:
+            return _serializer_fields[cls]
+        except KeyError:
+            pass
+        result = sorted(inspect.getmembers(cls, lambda a: isinstance(a, Field)), key=lambda p: p[1].position)
+        result = _serializer_fields[cls] = tuple(result)
+        return result
+
+    @classmethod
+    def compile(cls):
+        """
+        :return: function that serializes a single object, cached by class
+        """
+        try:
+            return _serializer_functions[cls]
+        except KeyError:
+            pass
+        fields = cls.get_fields()
+        plain = [(name, tuple((f.attr or name).split("__"))) for name, f in fields if not isinstance(f, Nested)]
+        names = tuple(name for name, _ in plain)
+        paths = tuple(parts for _, parts in plain)
+        getter = operator.attrgetter(*[".".join(parts) for parts in paths]) if paths else None
+        single = len(paths) == 1
+        nested = [(name, tuple((f.attr or name).split("__")), f.serializer_class, f.many)
+                  for name, f in fields if isinstance(f, Nested)]
+
+        def serialize(obj):
+            if getter is None:
+                values = ()
+            else:
+                try:
+                    values = getter(obj)
+                except AttributeError:
+                    # a None somewhere along a path
+                    values = tuple(_walk(obj, parts) for parts in paths)
+                else:
+                    if single:
+                        values = (values,)
+            result = dict(zip(names, values))
+            for name, parts, serializer_class, many in nested:
+                value = _walk(obj, parts)
+                if value is None:
+                    result[name] = None
+                elif many:
+                    func = serializer_class.compile()
+                    result[name] = [func(item) for item in value.all()]
+                else:
+                    result[name] = serializer_class.compile()(value)
+            return result
+
+        _serializer_functions[cls] = serialize
+        return serialize
+
+    @classmethod
+    def _plan_values(cls, model, prefix, paths, select_related, prefetch_related):
+        from ginger.dataset import resolve_field_path
+        plain = []
+        nested = []
+        usable = True
+        for name, field in cls.get_fields():
+            path = prefix + (field.attr or name)
+            is_value, related = resolve_field_path(model, path)
+            if isinstance(field, Nested):
+                if path in related:
+                    select_related.update(related)
+                    paths.append("%s__pk" % path)
+                    index = len(paths) - 1
+                    build = field.serializer_class._plan_values(model, "%s__" % path, paths,
+                                                                select_related, prefetch_related)
+                    nested.append((name, index, build))
+                    usable = usable and build is not None
+                else:
+                    select_related.update(related)
+                    usable = False
+                    target = _related_model(model, path)
+                    if target is not None:
+                        prefetch_related.add(path)
+                        _, _, nested_related, nested_prefetch = field.serializer_class.get_queryset_plan(target)
+                        prefetch_related.update("%s__%s" % (path, p) for p in nested_related + nested_prefetch)
+            else:
+                select_related.update(related)
+                if is_value:
+                    paths.append(path)
+                    plain.append((name, len(paths) - 1))
+                else:
+                    usable = False
+        if not usable:
+            return None
+
+        def build(row):
+            result = dict((name, row[index]) for name, index in plain)
+            for name, index, func in nested:
+                result[name] = None if row[index] is None else func(row)
+            return result
+        return build
+
+    @classmethod
+    def get_queryset_plan(cls, model):
+        """
+        :return: (fields, build, select_related, prefetch_related) where fields and build are the
+        values_list() arguments and the function that turns its rows into dicts, or None if the
+        objects are needed
+        """
+        plans = _serializer_plans.get(cls)
+        if plans is None:
+            plans = _serializer_plans[cls] = {}
+        try:
+            return plans[model]
+        except KeyError:
+            pass
+        fields = []
+        select_related = set()
+        prefetch_related = set()
+        build = cls._plan_values(model, "", fields, select_related, prefetch_related)
+        if build is None:
+            fields = None
+        result = plans[model] = (fields, build, sorted(select_related), sorted(prefetch_related))
+        return result
+
+    @classmethod
+    def prepare_queryset(cls, queryset):
+        fields, build, select_related, prefetch_related = cls.get_queryset_plan(queryset.model)
+        if fields is not None:
+            return queryset.values_list(*fields), build
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset, cls.compile()
+
+    @classmethod
+    def serialize(cls, source):
+        """
+        Serializes an object, a QuerySet or any other iterable of objects
+        """
+        if isinstance(source, QuerySet):
+            queryset, func = cls.prepare_queryset(source)
+            return [func(row) for row in queryset]
+        func = cls.compile()
+        if isinstance(source, (list, tuple)) or is_stream(source):
+            return [func(obj) for obj in source]
+        return func(source)
+
+    @classmethod
+    def iter_serialize(cls, queryset, chunk_size=500):
+        """
+        Yields serialized objects while reading queryset with iterator(), prefetching one chunk at a time
+        """
+        queryset, func = cls.prepare_queryset(queryset)
+        rows = iter_queryset(queryset, chunk_size)
+        lookups = queryset._prefetch_related_lookups
+        if not lookups:
+            for row in rows:
+                yield func(row)
+            return
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return
+            prefetch_related_objects(chunk, *lookups)
+            for obj in chunk:
+                yield func(obj)
 
 
 class JSONTemplate(object):
@@ -47,17 +434,160 @@ class JSONTemplate(object):
 
 
 def encode(payload, **kwargs):
-    return GingerJSONEncoder(**kwargs).encode(payload)
+    return get_backend().encode(payload, **kwargs)
+
+
+def is_stream(o):
+    return isinstance(o, QuerySet) or (isinstance(o, collections.Iterator) and not isinstance(o, six.string_types))
+
+
+def iter_encode(payload, serializers=None, chunk_size=500, buffer_size=64 * 1024):
+    """
+    Encodes payload incrementally and yields chunks of about buffer_size characters. Dicts are walked
+    key by key, QuerySets (read with iterator()) and other iterators are written as arrays, chunk_size
+    items per backend call. Everything else is encoded in one go.
+    """
+    buffer = []
+    size = 0
+    for piece in _iter_json(payload, get_backend(), serializers or {}, chunk_size):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= buffer_size:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _iter_json(o, backend, serializers, chunk_size):
+    if isinstance(o, dict):
+        yield "{"
+        for i, (key, value) in enumerate(six.iteritems(o)):
+            if not isinstance(key, six.string_types):
+                key = backend.encode(key) if key is None or isinstance(key, bool) else six.text_type(key)
+            yield "%s%s:" % ("," if i else "", backend.encode(key))
+            for piece in _iter_json(value, backend, serializers, chunk_size):
+                yield piece
+        yield "}"
+    elif is_stream(o):
+        if isinstance(o, QuerySet):
+            serializer_class = get_model_serializer(o, serializers)
+            if serializer_class is not None:
+                o = serializer_class.iter_serialize(o, chunk_size)
+            else:
+                o = iter_queryset(o, chunk_size)
+        yield "["
+        first = True
+        while True:
+            chunk = list(itertools.islice(o, chunk_size))
+            if not chunk:
+                break
+            content = backend.encode(chunk, serializers=serializers)
+            yield content[1:-1] if first else ",%s" % content[1:-1]
+            first = False
+        yield "]"
+    else:
+        yield backend.encode(o, serializers=serializers)
 
 
 def decode(payload):
-    return json.loads(payload)
+    return get_backend().decode(payload)
+
+
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+
+class StreamTooLarge(ValueError):
+    pass
+
+
+def iter_decode_array(stream, block_size=64 * 1024, max_size=None):
+    """
+    Parses a json array read from stream (anything with read(size)) one block at a time and yields
+    its items as soon as they are complete, so memory is bounded by the largest item rather than the
+    whole array.
+    :raise ValueError: for invalid json, or StreamTooLarge after max_size bytes
+    """
+    decoder = stdlib_json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    size = 0
+    eof = False
+    expect = "["
+    while True:
+        pos = _whitespace.match(buffer, pos).end()
+        if expect == "value" or pos == len(buffer):
+            if pos < len(buffer):
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if eof:
+                        raise
+                else:
+                    # a number may continue in the next block, so an item is complete
+                    # only once it is followed by a separator
+                    if eof or (end < len(buffer) and buffer[end] in " \t\n\r,]"):
+                        yield item
+                        pos = end
+                        expect = ","
+                        continue
+            elif eof:
+                raise ValueError("Unexpected end of json array")
+            block = stream.read(block_size)
+            size += len(block)
+            if max_size is not None and size > max_size:
+                raise StreamTooLarge("Content is larger than %d bytes" % max_size)
+            eof = not block
+            buffer = buffer[pos:] + text.decode(block, final=eof)
+            pos = 0
+            continue
+        char = buffer[pos]
+        pos += 1
+        if expect == "[":
+            if char != "[":
+                raise ValueError("Expected a json array")
+            expect = "first"
+        elif char == "]" and expect in ("first", ","):
+            return
+        elif expect == "first":
+            pos -= 1
+            expect = "value"
+        elif char == ",":
+            expect = "value"
+        else:
+            raise ValueError("Expected ',' or ']' at %r" % buffer[pos - 1:pos + 20])
+
+
+def iter_decode_lines(stream, max_size=None):
+    """
+    Yields the values of newline delimited json read line by line from stream, skipping blank lines
+    :raise ValueError: for invalid json, or StreamTooLarge after max_size bytes
+    """
+    size = 0
+    for line in stream:
+        size += len(line)
+        if max_size is not None and size > max_size:
+            raise StreamTooLarge("Content is larger than %d bytes" % max_size)
+        line = line.strip()
+        if line:
+            yield decode(line)
 
 
 def process_page(page):
+    if not getattr(page, 'numbered', True):
+        return {
+            'size': len(page),
+            'per_page': page.paginator.per_page,
+            'cursor': page.cursor,
+            'next': page.next_cursor,
+            'previous': page.previous_cursor
+        }
     top, bottom = page.start_index(), page.end_index()
     return {
         'total': page.paginator.count,
+        'exact': getattr(page.paginator, 'count_is_exact', True),
         'size': len(page),
         'per_page': page.paginator.per_page,
         'total_pages': page.paginator.num_pages,
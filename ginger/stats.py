@@ -1,8 +1,16 @@
 from __future__ import division
 import math
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-__all__ = ["divide", "mean", "sum"]
+
+__all__ = ["divide", "mean", "sum", "aggregate", "AGGREGATES"]
+
+
+AGGREGATES = ("count", "sum", "mean", "min", "max")
 
 
 def divide(num, denom):
@@ -26,4 +34,58 @@ def sum(iterable):
         if value is None:
             continue
         result += value
-    return result
\ No newline at end of file
+    return result
+
+
+def aggregate(iterable, names=AGGREGATES):
+    """
+    Computes several aggregates over iterable in a single pass, skipping None.
+    Numpy masked arrays are reduced with numpy instead, masked values being nulls.
+    :param iterable: values or numpy.ma.MaskedArray
+    :param names: any of count, sum, mean, min and max
+    :return: dict of name -> value
+    """
+    unknown = set(names).difference(AGGREGATES)
+    if unknown:
+        raise ValueError("Unknown aggregates: %s" % ", ".join(sorted(unknown)))
+    if numpy is not None and isinstance(iterable, numpy.ma.MaskedArray):
+        return _aggregate_array(iterable, names)
+    needs_total = "sum" in names or "mean" in names
+    needs_range = "min" in names or "max" in names
+    count = 0
+    total = 0
+    low = high = None
+    for value in iterable:
+        if value is None:
+            continue
+        count += 1
+        if needs_total:
+            total += value
+        if needs_range:
+            if low is None or value < low:
+                low = value
+            if high is None or value > high:
+                high = value
+    values = {
+        "count": count,
+        "sum": total,
+        "mean": divide(total, count),
+        "min": low,
+        "max": high
+    }
+    return dict((name, values[name]) for name in names)
+
+
+def _aggregate_array(values, names):
+    count = int(values.count())
+    result = {}
+    for name in names:
+        if name == "count":
+            value = count
+        elif not count:
+            value = 0 if name in ("sum", "mean") else None
+        else:
+            value = getattr(values, name)()
+            value = value.item() if hasattr(value, "item") else value
+        result[name] = value
+    return result
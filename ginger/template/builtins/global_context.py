@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 
-from django.core.urlresolvers import reverse as django_reverse, NoReverseMatch
+from django.core.urlresolvers import NoReverseMatch
 from django.contrib.staticfiles.storage import staticfiles_storage
+from ginger.urlcache import reverse
 
 
 __all__ = ['url', 'static']
@@ -19,7 +20,7 @@ def url(view_name, *args, **kwargs):
         {% url 'web:timeline' userid=2 %}
 
     """
-    return django_reverse(view_name, args=args, kwargs=kwargs)
+    return reverse(view_name, args=args, kwargs=kwargs)
 
 
 def static(path):
@@ -0,0 +1,158 @@
+"""
+Process local cache for url reversing.
+
+Entries are stored per resolver object. clear_url_caches() (and ROOT_URLCONF changes) make
+get_resolver return a new resolver, which discards everything cached for the old one.
+"""
+import re
+import weakref
+
+from django.core.urlresolvers import get_resolver, get_script_prefix, get_urlconf, NoReverseMatch
+from django.core.urlresolvers import reverse as django_reverse
+from django.utils import six
+from django.utils.encoding import force_text, iri_to_uri
+from django.utils.http import RFC3986_SUBDELIMS, urlquote
+from django.utils.translation import get_language
+
+try:
+    from django.utils.http import escape_leading_slashes
+except ImportError:
+    escape_leading_slashes = lambda url: url
+
+
+__all__ = ['reverse', 'get_formatters', 'MAX_CACHE_SIZE']
+
+
+MAX_CACHE_SIZE = 4096
+
+_safe_characters = RFC3986_SUBDELIMS + str('/~:@')
+
+_caches = weakref.WeakKeyDictionary()
+
+
+class ReverseFormatter(object):
+    """
+    One way of building a url for a pattern name: the %-format string of the pattern (with the
+    script prefix), its parameter names and the compiled regex the result must match.
+    """
+
+    __slots__ = ("format", "params", "param_set", "regex", "defaults")
+
+    def __init__(self, prefix, result, params, pattern, defaults):
+        self.format = prefix.replace('%', '%%') + result
+        self.params = tuple(params)
+        self.param_set = frozenset(params) | frozenset(defaults)
+        self.regex = re.compile('^%s%s' % (re.escape(prefix), pattern), re.UNICODE)
+        self.defaults = defaults
+
+    def format_url(self, args, kwargs):
+        """
+        Returns the url for args or kwargs, or None when they do not fit this formatter
+        """
+        if args:
+            if len(args) != len(self.params):
+                return None
+            subs = dict(six.moves.zip(self.params, (force_text(v) for v in args)))
+        else:
+            if (frozenset(kwargs) | frozenset(self.defaults)) != self.param_set:
+                return None
+            for k, v in six.iteritems(self.defaults):
+                if kwargs.get(k, v) != v:
+                    return None
+            subs = {k: force_text(v) for k, v in six.iteritems(kwargs)}
+        candidate = self.format % subs
+        if self.regex.search(candidate):
+            url = escape_leading_slashes(urlquote(candidate, safe=_safe_characters))
+            return force_text(iri_to_uri(url))
+        return None
+
+
+class _Failure(object):
+
+    __slots__ = ("args",)
+
+    def __init__(self, args):
+        self.args = args
+
+
+def _store(urls, key, value):
+    if len(urls) >= MAX_CACHE_SIZE:
+        urls.clear()
+    urls[key] = value
+
+
+def _get_cache(resolver):
+    try:
+        return _caches[resolver]
+    except KeyError:
+        cache = _caches[resolver] = ({}, {})
+        return cache
+
+
+def get_formatters(resolver, viewname, prefix):
+    """
+    Returns the ReverseFormatters of a (non namespaced) url name in resolver, compiled on first use
+    """
+    formatters = _get_cache(resolver)[0]
+    key = (viewname, get_language(), prefix)
+    try:
+        return formatters[key]
+    except KeyError:
+        pass
+    result = []
+    for possibility, pattern, defaults in resolver.reverse_dict.getlist(viewname):
+        for url, params in possibility:
+            result.append(ReverseFormatter(prefix, url, params, pattern, defaults))
+    formatters[key] = result
+    return result
+
+
+def _make_key(viewname, args, kwargs, current_app, prefix):
+    return (viewname, current_app, prefix, get_language(),
+            tuple((v.__class__, v) for v in args),
+            tuple(sorted((k, v.__class__, v) for k, v in six.iteritems(kwargs))))
+
+
+def reverse(viewname, urlconf=None, args=None, kwargs=None, current_app=None):
+    """
+    Same as django's reverse, but urls are looked up in a process local cache keyed by
+    (viewname, args, kwargs, urlconf) and plain url names are built from precompiled formatters
+    instead of walking the resolver's reverse dictionary. Failures are cached as well.
+    """
+    if urlconf is None:
+        urlconf = get_urlconf()
+    resolver = get_resolver(urlconf)
+    args = args or ()
+    kwargs = kwargs or {}
+    prefix = get_script_prefix()
+    urls = _get_cache(resolver)[1]
+    try:
+        key = _make_key(viewname, args, kwargs, current_app, prefix)
+        result = urls[key]
+    except TypeError:
+        key = None
+    except KeyError:
+        pass
+    else:
+        if isinstance(result, _Failure):
+            raise NoReverseMatch(*result.args)
+        return result
+    result = None
+    if isinstance(viewname, six.string_types) and ':' not in viewname:
+        if args and kwargs:
+            raise ValueError("Don't mix *args and **kwargs in call to reverse()!")
+        for formatter in get_formatters(resolver, viewname, prefix):
+            result = formatter.format_url(args, kwargs)
+            if result is not None:
+                break
+    if result is None:
+        try:
+            result = django_reverse(viewname, urlconf=urlconf, args=args, kwargs=kwargs,
+                                    current_app=current_app)
+        except NoReverseMatch as ex:
+            if key is not None:
+                _store(urls, key, _Failure(ex.args))
+            raise
+    if key is not None:
+        _store(urls, key, result)
+    return result
@@ -8,6 +8,8 @@ import hashlib
 import inspect
 import base64
 import pickle
+import weakref
+from collections import namedtuple
 from django.http.request import HttpRequest
 from django.utils.encoding import force_bytes
 from django.utils import six,timezone
@@ -21,6 +23,10 @@ all_cap_re = re.compile('([a-z0-9])([A-Z])')
 
 _context = threading.local()
 
+_argspecs = weakref.WeakKeyDictionary()
+
+ArgSpec = namedtuple("ArgSpec", "args varargs keywords")
+
 
 __all__ = [
     'camel_to_hyphen',
@@ -29,6 +35,7 @@ __all__ = [
     'join_with_underscore',
     'context',
     'qualified_name',
+    'get_argspec',
     'update_url_query',
     'get_form_name',
     'get_form_submit_name',
@@ -130,6 +137,30 @@ def qualified_name(cls):
     return ".".join(reversed(parts))
 
 
+def get_argspec(func):
+    """
+    Same as inspect.getargspec (keyword-only arguments are included in args) but computed once per
+    function. Bound methods are resolved to their function, so args includes self.
+    :return: ArgSpec(args, varargs, keywords)
+    """
+    func = getattr(func, "__func__", func)
+    try:
+        return _argspecs[func]
+    except (KeyError, TypeError):
+        pass
+    if six.PY2:
+        spec = inspect.getargspec(func)
+        result = ArgSpec(tuple(spec.args), spec.varargs, spec.keywords)
+    else:
+        spec = inspect.getfullargspec(func)
+        result = ArgSpec(tuple(spec.args + spec.kwonlyargs), spec.varargs, spec.varkw)
+    try:
+        _argspecs[func] = result
+    except TypeError:
+        pass
+    return result
+
+
 def create_hash(*args):
     """
     Returns a string representation of the provided arguments.
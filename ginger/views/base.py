@@ -1,17 +1,17 @@
-import inspect
-import functools
+import collections
+import copy
 import re
 from django.contrib import messages
 from django.core.exceptions import ObjectDoesNotExist, ImproperlyConfigured, PermissionDenied
 from django.core.serializers.json import DjangoJSONEncoder
-from django.core.urlresolvers import reverse
-from django.http.response import Http404, JsonResponse, HttpResponseBadRequest
+from django.http.response import Http404, JsonResponse, HttpResponseNotAllowed
 from django.utils.text import camel_case_to_spaces
 from django.views.generic.base import View
 from django.conf.urls import url
 from django.utils import six
 from .meta import ViewInfo
 from ginger import utils, pattern
+from ginger.urlcache import reverse
 
 
 __all__ = ["GingerView", "GingerViewSetMixin", 'view', 'list_view', 'object_view']
@@ -44,10 +44,12 @@ class ViewMeta(ViewInfo):
         view_func = self.view.as_view(**kwargs)
         regex = self.url_regex
         url_name = self.url_name
-        regex = pattern.Pattern(regex, prefix).create()
+        source = pattern.Pattern(regex, prefix)
         if prefix:
             url_name = "%s_%s" % (prefix, url_name)
-        return url(regex, view_func, name=url_name)
+        result = url(source.create(), view_func, name=url_name)
+        result.source_pattern = source
+        return result
 
     def reverse(self, args, kwargs):
         return reverse(self.url_name, args=args, kwargs=kwargs)
@@ -92,10 +94,81 @@ class GingerSessionDataMixin(object):
         return utils.create_hash(utils.qualified_name(cls))
 
 
+class SubView(object):
+    many = False
+    suffix = None
+    regex = None
+    label = None
+    icon = None
+    methods = None
+    handler = None
+
+    def __init__(self, name, **kwargs):
+        for k,v in kwargs.items():
+            setattr(self, k, v)
+        self.name = name
+        if self.suffix is None:
+            self.suffix = self.name
+        if not self.label:
+            self.label = self.name.capitalize()
+        if self.methods:
+            self.methods = tuple(m.upper() for m in self.methods)
+
+    def allows(self, method):
+        return not self.methods or method in self.methods
+
+
+def view(fn=None, **kwargs):
+    if kwargs and fn:
+        raise TypeError("Only keyword arguments are accepted")
+
+    def wrapper(func):
+        func.subview = SubView(name=func.__name__, **kwargs)
+        return func
+
+    if not kwargs and callable(fn):
+        return wrapper(fn)
+
+    return wrapper
+
+
+def list_view(fn=None, **kwargs):
+    kwargs['many'] = True
+    return view(fn=fn, **kwargs)
+
+def object_view(fn=None, **kwargs):
+    kwargs['many'] = False
+    return view(fn=fn, **kwargs)
+
+
+def collect_subviews(cls):
+    """
+    Maps the name of each @view method of cls to a copy of its SubView whose handler is the function
+    found on the class, in name order. A method overridden without @view is no longer a subview.
+    """
+    table = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in six.iteritems(vars(klass)):
+            subview = getattr(value, 'subview', None) if callable(value) else None
+            if isinstance(subview, SubView):
+                subview = copy.copy(subview)
+                subview.handler = value
+                table[name] = subview
+            else:
+                table.pop(name, None)
+    return collections.OrderedDict(sorted(table.items()))
+
+
+def get_child_views(cls):
+    table = cls.__dict__.get('subview_table')
+    if table is None:
+        table = collect_subviews(cls)
+    return list(table.values())
+
+
 class GingerMetaView(type):
 
     __position = 0
-    __actions = None
 
     def __init__(cls, name, bases, attrs):
         super(GingerMetaView, cls).__init__(name, bases, attrs)
@@ -103,6 +176,7 @@ class GingerMetaView(type):
         cls.position = GingerMetaView.__position
         cls.__abstract__ = attrs.get("__abstract__", False)
         cls.base_name = "_".join(camel_case_to_spaces(re.sub(r'(?i)view.*', '', cls.__name__)).split())
+        cls.subview_table = collect_subviews(cls)
 
 
 class BasicView(View, GingerSessionDataMixin):
@@ -238,62 +312,6 @@ class GingerView(BasicView, GingerSessionDataMixin):
         return kwargs
 
 
-class SubView(object):
-    many = False
-    suffix = None
-    regex = None
-    label = None
-    icon = None
-
-    def __init__(self, name, **kwargs):
-        for k,v in kwargs.items():
-            setattr(self, k, v)
-        self.name = name
-        if self.suffix is None:
-            self.suffix = self.name
-        if not self.label:
-            self.label = self.name.capitalize()
-
-
-def view(fn=None, **kwargs):
-    if kwargs and fn:
-        raise TypeError("Only keyword arguments are accepted")
-
-    methods = kwargs.pop("methods", None)
-
-    def wrapper(func):
-        subview = SubView(name=func.__name__, **kwargs)
-        wrapped = func
-        if methods:
-            def closure(self, request, *args, **kw):
-                if request.method not in methods:
-                    return HttpResponseBadRequest("")
-                response = func(self, request, *args, **kw)
-                return response
-            wrapped = functools.update_wrapper(closure, func)
-        wrapped.subview = subview
-        return func
-
-    if not kwargs and callable(fn):
-        return wrapper(fn)
-
-    return wrapper
-
-
-def list_view(fn=None, **kwargs):
-    kwargs['many'] = True
-    return view(fn=fn, **kwargs)
-
-def object_view(fn=None, **kwargs):
-    kwargs['many'] = False
-    return view(fn=fn, **kwargs)
-
-def get_child_views(cls):
-    for name, func in inspect.getmembers(cls):
-        if callable(func) and hasattr(func, 'subview'):
-            yield func.subview
-
-
 class GingerViewSetMixin(object):
 
     def check_object_permissions(self, obj):
@@ -309,12 +327,19 @@ class GingerViewSetMixin(object):
         return reverse(url_name, kwargs=kwargs, args=args)
 
     def get(self, request, *args, **kwargs):
-        self.check_user_permissions()
-        return getattr(self, self.action)(request)
+        return self.dispatch_action(request)
 
     def post(self, request, *args, **kwargs):
+        return self.dispatch_action(request)
+
+    def dispatch_action(self, request):
         self.check_user_permissions()
-        return getattr(self, self.action)(request)
+        subview = self.subview_table.get(self.action)
+        if subview is None:
+            raise Http404
+        if not subview.allows(request.method):
+            return HttpResponseNotAllowed(subview.methods)
+        return subview.handler(self, request)
 
     def process_response(self, request, response):
         if isinstance(response, dict):
@@ -336,7 +361,8 @@ class GingerViewSetMixin(object):
                 regex = "%s%s/" % (regex, subview.suffix,)
             if subview.regex:
                 regex = "%s%s" % (regex, subview.regex)
-            url_regex = pattern.Pattern(regex).create()
+            source = pattern.Pattern(regex)
+            url_regex = source.create()
             url_name = "_".join([base_name, subview.name]).lower()
             view_class = url(url_regex, cls.as_view(
                 action=subview.name,
@@ -344,6 +370,7 @@ class GingerViewSetMixin(object):
                 url_regex=url_regex,
                 **kwargs
             ), name=url_name)
+            view_class.source_pattern = source
             result.append(view_class)
         return result
 
@@ -1,7 +1,7 @@
 
 from django import forms
 import os
-import inspect
+import weakref
 from datetime import timedelta
 from django.utils.six.moves.urllib.parse import urljoin
 from django.core.paginator import EmptyPage, Page
@@ -14,9 +14,10 @@ from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
 from django.forms.models import ModelForm
 from django.utils.functional import cached_property
 from django.views.generic.base import TemplateResponseMixin
-from django.core.urlresolvers import reverse
 from django.shortcuts import redirect
 
+from ginger import utils
+from ginger.urlcache import reverse
 from ginger.exceptions import Http404, Redirect, BadRequest
 from ginger.serializer import process_redirect
 from ginger.templates import GingerResponse
@@ -38,6 +39,11 @@ __all__ = ['GingerView', 'GingerTemplateView', 'GingerSearchView',
            ]
 
 
+PAGE_CONTEXT_KEYS = ("page_heading", "page_title", "page_actions", "page_css_class")
+
+_page_context_adapters = weakref.WeakKeyDictionary()
+
+
 class GingerTemplateView(GingerView, TemplateResponseMixin):
 
     view_icon = None
@@ -113,18 +119,29 @@ class GingerTemplateView(GingerView, TemplateResponseMixin):
     def get_view_label(self):
         return self.view_label
 
+    @classmethod
+    def get_page_context_adapters(cls):
+        """
+        (context key, method name, whether the method takes ctx) for each page_* context value,
+        inspected once per class
+        """
+        try:
+            return _page_context_adapters[cls]
+        except KeyError:
+            adapters = []
+            for key in PAGE_CONTEXT_KEYS:
+                name = "get_%s" % key
+                adapters.append((key, name, len(utils.get_argspec(getattr(cls, name)).args) > 1))
+            _page_context_adapters[cls] = adapters
+            return adapters
+
     def render_to_response(self, ctx, **response_kwargs):
         if not self.request.is_ajax():
-            if six.PY2:
-                len(inspect.getargspec(self.get_page_heading).args)
-                safe_call = lambda fn, arg: fn(arg) if len(inspect.getargspec(fn).args) > 1 else fn()
-            else:
-                safe_call = lambda fn, arg: fn(arg) if len(inspect.Signature.from_callable(fn).parameters) > 0 else fn()
             ctx['view'] = self
-            ctx.setdefault('page_heading',  safe_call(self.get_page_heading, ctx))
-            ctx.setdefault('page_title',    safe_call(self.get_page_title, ctx))
-            ctx.setdefault('page_actions',  safe_call(self.get_page_actions, ctx))
-            ctx.setdefault('page_css_class',safe_call(self.get_page_css_class, ctx))
+            for key, name, takes_context in self.get_page_context_adapters():
+                if key not in ctx:
+                    func = getattr(self, name)
+                    ctx[key] = func(ctx) if takes_context else func()
         response = super(GingerTemplateView, self).render_to_response(ctx, **response_kwargs)
         return response
 
@@ -302,6 +319,7 @@ class GingerSearchView(GingerFormView):
     per_page = 20
     page_parameter_name = "page"
     page_limit = 10
+    page_count_strategy = None
     paginate = True
     context_object_list_key = "object_list"
     context_page_key = 'page_object'
@@ -312,6 +330,7 @@ class GingerSearchView(GingerFormView):
             ctx["parameter_name"] = self.page_parameter_name
             ctx["page_limit"] = self.page_limit
             ctx["per_page"] = self.per_page
+            ctx["count_strategy"] = self.page_count_strategy
             ctx["page"] = self.request
             if hasattr(self, 'queryset'):
                 ctx["queryset"] = self.get_queryset()
@@ -467,6 +486,12 @@ class GingerWizardView(GingerStepViewMixin, GingerFormView):
     def get_form_storage(self):
         return self.form_storage_class(self)
 
+    def process_response(self, request, response):
+        response = super(GingerWizardView, self).process_response(request, response)
+        if 'form_storage' in self.__dict__:
+            self.form_storage.update_response(response)
+        return response
+
     def get_file_storage(self):
         location = self.file_upload_dir or getattr(settings, "TEMP_MEDIA_DIR", "tmp")
         return FileSystemStorage(
@@ -685,6 +710,8 @@ class GingerListView(MultipleObjectViewMixin, GingerTemplateView):
     per_page = 20
     page_parameter_name = "page"
     page_limit = 10
+    page_keyset = False
+    page_count_strategy = None
     paginate = True
     context_page_key = 'page_object'
 
@@ -692,7 +719,9 @@ class GingerListView(MultipleObjectViewMixin, GingerTemplateView):
         return paginate(queryset, self.request,
                         parameter_name=self.page_parameter_name,
                         per_page=self.per_page,
-                        page_limit=self.page_limit)
+                        page_limit=self.page_limit,
+                        keyset=self.page_keyset,
+                        count_strategy=self.page_count_strategy)
 
     def get_context_data(self, **kwargs):
         ctx = super(GingerListView,self).get_context_data(**kwargs)
@@ -1,12 +1,15 @@
 
 import logging
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connections
 from django.http.response import Http404
 from django.utils.decorators import method_decorator
 
+from django.core.paginator import Page
+from django.utils import six
 from django.utils.functional import cached_property
 from django.views.generic import View
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
 from ginger import serializer
@@ -16,6 +19,11 @@ from ginger.exceptions import (
 
 from .base import GingerView
 
+try:
+    from concurrent import futures
+except ImportError:
+    futures = None
+
 __all__ = ['GingerJSONView']
 
 
@@ -25,6 +33,16 @@ logger = logging.getLogger('ginger.views')
 class GingerJSONView(GingerView):
 
     MAX_CONTENT_SIZE = 32 * 1024
+    MAX_STREAM_SIZE = None
+    STREAM_CONTENT_TYPES = ("application/x-ndjson", "application/jsonlines", "application/x-jsonlines")
+
+    stream_argument = None
+    stream_collections = False
+    stream_chunk_size = 500
+
+    MAX_BATCH_SIZE = 50
+    batch_methods = None
+    batch_workers = None
 
     @method_decorator(csrf_exempt)
     def dispatch(self, request, *args, **kwargs):
@@ -32,15 +50,12 @@ class GingerJSONView(GingerView):
             self.process_request(request)
             method = request.method.lower()
             func = getattr(self, method, None)
-            if not func:
+            if self.is_batch_request():
+                payload = self.dispatch_batch(self.JSON)
+            elif not func:
                 raise MethodNotFound
-            params = self.get_params()
-            if isinstance(params, dict):
-                payload = func(**params)
-            elif params:
-                raise BadRequest("Invalid parameters format")
-            if hasattr(payload, 'to_json'):
-                payload = payload.to_json()
+            else:
+                payload = self.call(func, self.get_params())
             status = 200
         except Exception as exc:
             status, payload = serializer.process_exception(request, exc)
@@ -48,23 +63,127 @@ class GingerJSONView(GingerView):
                 logger.exception("Operation failed")
         return self.render_to_response(payload, status=status)
 
+    def call(self, func, params):
+        if isinstance(params, dict):
+            payload = func(**params)
+        elif params:
+            raise BadRequest("Invalid parameters format")
+        else:
+            payload = func()
+        if hasattr(payload, 'to_json'):
+            payload = payload.to_json()
+        return payload
+
+    def is_batch_request(self):
+        return bool(self.batch_methods) and self.request.method == "POST" \
+            and not self.stream_argument and isinstance(self.JSON, list)
+
+    def get_batch_handler(self, name):
+        if name not in self.batch_methods:
+            raise MethodNotFound
+        return getattr(self, name)
+
+    def call_batch_item(self, item):
+        """
+        Runs one {"method": ..., "params": ...} entry of a batch and returns its result in the
+        {"id", "status", "data"} envelope. Failures are reported per call and never abort the batch.
+        """
+        request = self.request
+        result = {'id': item.get('id') if isinstance(item, dict) else None}
+        try:
+            if not isinstance(item, dict) or not isinstance(item.get('method'), six.string_types):
+                raise BadRequest("Invalid batch call")
+            func = self.get_batch_handler(item['method'])
+            result['data'] = self.call(func, item.get('params'))
+            result['status'] = 200
+        except Exception as exc:
+            status, payload = serializer.process_exception(request, exc)
+            if status == 500:
+                logger.exception("Batch call failed")
+            result['status'] = status
+            result['error'] = payload
+        return result
+
+    def _call_batch_item_in_thread(self, item):
+        try:
+            return self.call_batch_item(item)
+        finally:
+            connections.close_all()
+
+    def dispatch_batch(self, items):
+        """
+        Serves a POSTed list of calls with a single request. Only methods named in batch_methods
+        can be called. With batch_workers set, calls run on a thread pool and so must not depend
+        on one another or on state they set on the view.
+        """
+        if len(items) > self.MAX_BATCH_SIZE:
+            raise BadRequest("Batch is larger than %d calls" % self.MAX_BATCH_SIZE)
+        workers = self.batch_workers
+        if not workers or futures is None or len(items) < 2:
+            return [self.call_batch_item(item) for item in items]
+        with futures.ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+            return list(executor.map(self._call_batch_item_in_thread, items))
+
     def get_serializers(self):
         return getattr(self, 'serializers', {})
 
     def render_to_response(self, payload, **kwargs):
-        content = serializer.encode(payload, serializers=self.get_serializers())
         kwargs.setdefault('status', 200)
         kwargs.setdefault('content_type', 'application/json')
+        if self.stream_collections and kwargs['status'] == 200 and \
+                (isinstance(payload, Page) or serializer.is_stream(payload)):
+            return self.render_to_streaming_response(payload, **kwargs)
+        content = serializer.encode(payload, serializers=self.get_serializers())
         return HttpResponse(content, **kwargs)
 
+    def render_to_streaming_response(self, payload, **kwargs):
+        """
+        Streams a QuerySet, Page or iterator as {"data": ..., "page": ...} while it is being read.
+        Errors raised after the first chunk can no longer change the response status.
+        """
+        content = serializer.iter_encode(serializer.encode_collection(payload),
+                                         serializers=self.get_serializers(),
+                                         chunk_size=self.stream_chunk_size)
+        return StreamingHttpResponse(content, **kwargs)
+
     def get_params(self):
+        if self.stream_argument and self.request.method in ("POST", "PUT", "PATCH"):
+            return {self.stream_argument: self.iter_stream()}
         return self.JSON
 
+    def iter_stream(self):
+        """
+        Yields the items of a json array, or the lines of newline delimited json, as the request body
+        is read. Handlers receive it as their stream_argument keyword and must consume it before returning.
+        """
+        request = self.request
+        limit = self.MAX_STREAM_SIZE
+        if request.content_type in self.STREAM_CONTENT_TYPES:
+            items = serializer.iter_decode_lines(request, max_size=limit)
+        else:
+            items = serializer.iter_decode_array(request, max_size=limit)
+        try:
+            for item in items:
+                yield item
+        except ValueError as ex:
+            raise BadRequest("Invalid json stream: %s" % ex)
+
     @cached_property
     def JSON(self):
         request = self.request
         limit = self.MAX_CONTENT_SIZE
-        content = request.read(limit)
+        if limit is None:
+            content = request.read()
+        else:
+            try:
+                length = int(request.META.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                length = 0
+            if length > limit:
+                raise BadRequest("Request body is larger than %d bytes" % limit)
+            content = request.read(limit + 1)
+            if len(content) > limit:
+                raise BadRequest("Request body is larger than %d bytes" % limit)
         if not content:
             payload = {}
         else:
@@ -1,11 +1,20 @@
 
 import copy
-from django.utils import six
+import uuid
+from datetime import timedelta
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import six, timezone
+from django.utils.datastructures import MultiValueDict
 from django.core.files.uploadedfile import UploadedFile
 from django.core.files.base import File
 
+from ginger import utils
 
-__all__ = ['FormStorageBase', 'SessionFormStorage']
+
+__all__ = ['FormStorageBase', 'SessionFormStorage', 'StepFormStorageBase', 'CacheFormStorage',
+           'CookieFormStorage', 'ModelFormStorage']
 
 
 class StorageFile(object):
@@ -57,7 +66,7 @@ class FormStorageBase(object):
 
     def restore_files(self, form_data):
         data = copy.copy(form_data)
-        for k, v in form_data.iteritems():
+        for k, v in six.iteritems(form_data):
             if isinstance(v, StorageFile):
                 data[k] = v.load(self.file_storage)
         return data
@@ -84,6 +93,15 @@ class FormStorageBase(object):
         if self.autocommit:
             self._save_data()
 
+    def commit(self):
+        self._save_data()
+
+    def update_response(self, response):
+        """
+        Called with the wizard's response, for backends that keep their data in it
+        """
+        pass
+
     def _load_data(self):
         self.data = self.load()
         if not isinstance(self.data, dict):
@@ -112,3 +130,205 @@ class SessionFormStorage(FormStorageBase):
     def store(self, data):
         self.session[self.step_key] = data
         self.session.modified = True
+
+
+class StepFormStorageBase(FormStorageBase):
+    """
+    Base for backends that keep every step under its own key: steps are loaded when first read and
+    set() writes only the step that changed instead of the whole wizard. Subclasses implement
+    load_step, store_step and delete_steps; timeout is the lifetime of stored steps in seconds.
+    """
+
+    timeout = 24 * 60 * 60
+
+    def _load_data(self):
+        self.data = {}
+        self.dirty = set()
+        self.cleared = False
+
+    def set(self, step_name, data, files):
+        self.data[step_name] = data, self.reduce_files(files)
+        self.dirty.add(step_name)
+        if self.autocommit:
+            self._save_data()
+
+    def get(self, step_name):
+        if step_name not in self.data:
+            self.data[step_name] = None if self.cleared else self.load_step(step_name)
+        value = self.data[step_name]
+        if value is None:
+            return None, None
+        data, files = value
+        return data, self.restore_files(files)
+
+    def clear(self):
+        self.data.clear()
+        self.dirty.clear()
+        self.cleared = True
+        if self.autocommit:
+            self._save_data()
+
+    def _save_data(self):
+        if self.cleared:
+            self.delete_steps()
+            self.cleared = False
+        for step_name in self.dirty:
+            self.store_step(step_name, self.data[step_name])
+        self.dirty.clear()
+
+    def get_step_names(self):
+        return self.wizard.get_step_names()
+
+    def load_step(self, step_name):
+        raise NotImplementedError
+
+    def store_step(self, step_name, value):
+        raise NotImplementedError
+
+    def delete_steps(self):
+        raise NotImplementedError
+
+
+class WizardRunMixin(object):
+    """
+    Identifies a wizard run by a random id kept in the session, which is written once per run
+    """
+
+    def get_run_id(self, create=False):
+        session = self.wizard.request.session
+        run_id = session.get(self.step_key)
+        if not run_id and create:
+            run_id = session[self.step_key] = uuid.uuid4().hex
+        return run_id
+
+    def forget_run_id(self):
+        self.wizard.request.session.pop(self.step_key, None)
+
+
+class CacheFormStorage(WizardRunMixin, StepFormStorageBase):
+
+    cache_alias = "default"
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, run_id, step_name):
+        return "%s-%s-%s" % (self.step_key, run_id, step_name)
+
+    def load_step(self, step_name):
+        run_id = self.get_run_id()
+        if not run_id:
+            return None
+        return self.cache.get(self.make_key(run_id, step_name))
+
+    def store_step(self, step_name, value):
+        self.cache.set(self.make_key(self.get_run_id(True), step_name), value, self.timeout)
+
+    def delete_steps(self):
+        run_id = self.get_run_id()
+        if run_id:
+            self.cache.delete_many([self.make_key(run_id, name) for name in self.get_step_names()])
+            self.forget_run_id()
+
+
+class CookieFormStorage(StepFormStorageBase):
+    """
+    Keeps each step in its own signed (not encrypted) cookie, so nothing is stored server side
+    except uploaded files. Only suitable for small forms: a step that does not fit in
+    max_cookie_size raises ValueError.
+    """
+
+    max_cookie_size = 4000
+
+    def _load_data(self):
+        super(CookieFormStorage, self)._load_data()
+        self.cookies = {}
+
+    def make_key(self, step_name):
+        return "%s-%s" % (self.step_key, step_name)
+
+    def load_step(self, step_name):
+        key = self.make_key(step_name)
+        value = self.wizard.request.COOKIES.get(key)
+        if value is None:
+            return None
+        try:
+            data, files = signing.loads(value, salt=key, max_age=self.timeout)
+        except (signing.BadSignature, ValueError, TypeError):
+            return None
+        files = {k: self.decode_file(v) for k, v in six.iteritems(files)}
+        return MultiValueDict(data), files
+
+    def decode_file(self, value):
+        result = StorageFile()
+        result.data = value
+        return result
+
+    def store_step(self, step_name, value):
+        key = self.make_key(step_name)
+        data, files = value
+        data = {k: data.getlist(k) if hasattr(data, "getlist") else [data[k]] for k in data}
+        files = {k: v.data for k, v in six.iteritems(files or {}) if isinstance(v, StorageFile)}
+        encoded = signing.dumps([data, files], salt=key, compress=True)
+        if len(encoded) > self.max_cookie_size:
+            raise ValueError("Wizard step %r is too large for a cookie" % step_name)
+        self.cookies[key] = encoded
+
+    def delete_steps(self):
+        prefix = self.make_key("")
+        for key in [k for k in self.cookies if k.startswith(prefix)]:
+            del self.cookies[key]
+        for key in self.wizard.request.COOKIES:
+            if key.startswith(prefix):
+                self.cookies[key] = None
+
+    def update_response(self, response):
+        for key, value in six.iteritems(self.cookies):
+            if value is None:
+                response.delete_cookie(key)
+            else:
+                response.set_cookie(key, value, max_age=self.timeout, httponly=True)
+        self.cookies.clear()
+
+
+class ModelFormStorage(WizardRunMixin, StepFormStorageBase):
+    """
+    Stores steps as rows of model, a concrete subclass of ginger.models.AbstractWizardStep.
+    Expired rows are ignored and can be removed with delete_expired.
+    """
+
+    model = None
+
+    @classmethod
+    def get_model(cls):
+        if cls.model is None:
+            raise ImproperlyConfigured("%s.model is not set" % cls.__name__)
+        return cls.model
+
+    def load_step(self, step_name):
+        run_id = self.get_run_id()
+        if not run_id:
+            return None
+        rows = self.get_model().objects.filter(run_id=run_id, step_name=step_name,
+                                               expires__gt=timezone.now())
+        for value in rows.values_list("data", flat=True)[:1]:
+            return utils.base64pickle_loads(value)
+        return None
+
+    def store_step(self, step_name, value):
+        expires = timezone.now() + timedelta(seconds=self.timeout)
+        self.get_model().objects.update_or_create(
+            run_id=self.get_run_id(True), step_name=step_name,
+            defaults={"data": utils.base64pickle_dumps(value), "expires": expires}
+        )
+
+    def delete_steps(self):
+        run_id = self.get_run_id()
+        if run_id:
+            self.get_model().objects.filter(run_id=run_id).delete()
+            self.forget_run_id()
+
+    @classmethod
+    def delete_expired(cls):
+        cls.get_model().objects.filter(expires__lte=timezone.now()).delete()
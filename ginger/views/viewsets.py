@@ -3,6 +3,7 @@ from ginger.forms.forms import action_model_factory
 
 from django.conf import settings
 from django.http.response import Http404, HttpResponse
+from ginger.exceptions import BadRequest
 from django.shortcuts import redirect
 from ginger.paginator import GingerPaginator
 from .base import GingerViewSetMixin, view
@@ -16,7 +17,8 @@ __all__ = ['GingerViewSet',
            'UpdateViewSetMixin',
            'ListViewSetMixin',
            'DeleteViewSetMixin',
-           'DetailViewSetMixin'
+           'DetailViewSetMixin',
+           'ExportViewSetMixin'
            ]
 
 
@@ -94,6 +96,30 @@ class ListViewSetMixin(object):
         return self.render_to_response(self.get_context_data(**ctx))
 
 
+class ExportViewSetMixin(object):
+
+    params_export_key = 'format'
+    export_variant = None
+    export_chunk_size = 500
+    export_header = True
+    export_hidden = False
+
+    @view(many=True)
+    def export(self, request):
+        object_list_formatter = self.get_object_list_formatter()
+        object_list = self.filter_queryset(self.get_queryset(), formatter_class=object_list_formatter)
+        table = object_list_formatter(object_list, variant=self.export_variant)
+        export_format = request.GET.get(self.params_export_key, "csv")
+        if export_format not in dict(table.export_formats()):
+            raise BadRequest()
+        return table.export_response(export_format, filename=self.get_export_filename(),
+                                     header=self.export_header, hidden=self.export_hidden,
+                                     chunk_size=self.export_chunk_size)
+
+    def get_export_filename(self):
+        return self.base_name
+
+
 class GingerModelViewSet(GingerViewSetMixin, GingerFormView):
 
     filter_class = None
@@ -109,6 +135,7 @@ class GingerModelViewSet(GingerViewSetMixin, GingerFormView):
     context_formatted_object_key = 'formatted_object'
     params_page_key = 'page'
     per_page = None
+    count_strategy = None
 
     OK_BACK = 1
     YES_BACK = 2
@@ -183,7 +210,8 @@ class GingerModelViewSet(GingerViewSetMixin, GingerFormView):
     def paginate_queryset(self, queryset):
         if not self.per_page:
             return queryset
-        return self.paginator(queryset, per_page=self.per_page, parameter_name=self.params_page_key, allow_empty=False).page(self.request)
+        return self.paginator(queryset, per_page=self.per_page, parameter_name=self.params_page_key,
+                              allow_empty=False, count_strategy=self.count_strategy).page(self.request)
 
     def get_object(self):
         queryset = self.filter_queryset(self.get_queryset())